@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+"""
+Transfers per second of ConcurrentBankingSystem as worker threads grow.
+
+Run from the repository root with ``python -m benchmarks.bench_banking``.
+"""
+import argparse
+import random
+
+from benchmarks.common import run_threads
+from src.white_box import ConcurrentBankingSystem
+
+
+def measure(thread_count, transfers, accounts):
+    """
+    Returns the transfers per second of ``thread_count`` threads sharing
+    ``transfers`` random transfers between ``accounts`` accounts.
+    """
+    banking_system = ConcurrentBankingSystem(default_balance=10**9)
+    names = [f"account {i}" for i in range(accounts)]
+    # Sessions are opened directly, logging in would time password hashing.
+    banking_system.logged_in_users.ttl = float("inf")
+    for name in names:
+        banking_system.get_account(name)
+        banking_system.logged_in_users.add(name)
+
+    def work(worker):
+        rng = random.Random(worker)
+        for _ in range(transfers // thread_count):
+            sender, receiver = rng.sample(names, 2)
+            banking_system.apply_transfer(sender, receiver, 1, "regular")
+
+    return transfers / run_threads(work, thread_count)
+
+
+def main():
+    """
+    Prints the throughput for each worker count.
+    """
+    parser = argparse.ArgumentParser(description="Concurrent transfer benchmark.")
+    parser.add_argument("--transfers", type=int, default=200000)
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    for threads in args.threads:
+        throughput = measure(threads, args.transfers, args.accounts)
+        print(f"{threads:>3} threads: {throughput:>12,.0f} transfers/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+"""
+Throughput of ConcurrentBookStore for a read-mostly workload as threads grow.
+
+Run from the repository root with ``python -m benchmarks.bench_book_store``.
+"""
+import argparse
+import os
+import random
+from contextlib import redirect_stdout
+
+from benchmarks.common import run_threads
+from src.book_store import Book, ConcurrentBookStore
+
+WORDS = ("dune", "emma", "river", "night", "house", "stone", "garden", "winter")
+
+
+def random_title(rng):
+    """
+    Returns a random three word title.
+    """
+    return " ".join(rng.choices(WORDS, k=3)).title()
+
+
+def build_store(book_count, seed=0):
+    """
+    Returns a store filled with random books, with its lazy indexes built.
+    """
+    rng = random.Random(seed)
+    book_store = ConcurrentBookStore()
+    book_store.add_books(
+        Book(random_title(rng), f"Author {i % 1000}", rng.uniform(1, 50), 1)
+        for i in range(book_count)
+    )
+    book_store.search_substring("warm up", limit=1)
+    book_store.find_books_by_price(0, 0)
+    return book_store
+
+
+def measure(book_store, thread_count, operations, write_ratio):
+    """
+    Returns the operations per second of ``thread_count`` threads sharing
+    ``operations`` lookups and inserts.
+    """
+
+    def work(worker):
+        rng = random.Random(worker)
+        for i in range(operations // thread_count):
+            if rng.random() < write_ratio:
+                book_store.add_book(Book(random_title(rng), f"Writer {worker}", 9, i))
+            elif i % 2:
+                book_store.search_substring(rng.choice(WORDS), limit=10)
+            else:
+                book_store.find_books_by_author(f"author {rng.randrange(1000)}")
+
+    return operations / run_threads(work, thread_count)
+
+
+def main():
+    """
+    Prints the throughput for each thread count.
+    """
+    parser = argparse.ArgumentParser(description="ConcurrentBookStore throughput.")
+    parser.add_argument("--books", type=int, default=100000)
+    parser.add_argument("--operations", type=int, default=40000)
+    parser.add_argument("--write-ratio", type=float, default=0.01)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    book_store = build_store(args.books)
+    with open(os.devnull, "w", encoding="utf-8") as sink:
+        # add_book prints a line per insert, keep it out of the report.
+        with redirect_stdout(sink):
+            results = [
+                (
+                    threads,
+                    measure(book_store, threads, args.operations, args.write_ratio),
+                )
+                for threads in args.threads
+            ]
+    for threads, throughput in results:
+        print(f"{threads:>3} threads: {throughput:>12,.0f} operations/s")
+
+
+if __name__ == "__main__":
+    main()
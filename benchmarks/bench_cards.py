@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+"""
+Card number screening one number at a time against the batch validator.
+
+Run from the repository root with ``python -m benchmarks.bench_cards``.
+"""
+import argparse
+import random
+
+from benchmarks.common import best_time
+from src.white_box import validate_credit_card, validate_credit_cards
+
+
+def validate_each(card_numbers, strict):
+    """
+    Validates every card number with the per-number function.
+    """
+    return [
+        validate_credit_card(card_number, strict) == "Valid Card"
+        for card_number in card_numbers
+    ]
+
+
+def main():
+    """
+    Prints the timings of both validators in both modes.
+    """
+    parser = argparse.ArgumentParser(description="Card validation benchmark.")
+    parser.add_argument("--cards", type=int, default=1000000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    card_numbers = [
+        rng.choice("3456") + "".join(rng.choices("0123456789", k=rng.randint(12, 15)))
+        for _ in range(args.cards)
+    ]
+    print(f"{args.cards:,} card numbers")
+    for strict in (False, True):
+        print(f"  strict={strict}")
+        print(
+            "    validate_credit_card: "
+            f"{best_time(validate_each, card_numbers, strict):.3f} s"
+        )
+        print(
+            "    validate_credit_cards: "
+            f"{best_time(validate_credit_cards, card_numbers, strict):.3f} s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+"""
+Checking out many carts one at a time against the batch checkouts.
+
+Run from the repository root with ``python -m benchmarks.bench_carts``.
+"""
+import argparse
+import os
+import random
+from array import array
+from contextlib import redirect_stdout
+from itertools import accumulate
+
+from benchmarks.common import best_time
+from src.white_box import Product, ShoppingCart, checkout_carts, checkout_totals
+
+
+def build_carts(cart_count, max_lines, rng):
+    """
+    Returns random carts over a small catalogue of shared products.
+    """
+    products = [
+        Product(f"product {i}", round(rng.uniform(1, 100), 2)) for i in range(1000)
+    ]
+    carts = []
+    for _ in range(cart_count):
+        cart = ShoppingCart()
+        cart.add_many(
+            (product, rng.randint(1, 5))
+            for product in rng.sample(products, rng.randint(1, max_lines))
+        )
+        carts.append(cart)
+    return carts
+
+
+def flatten(carts):
+    """
+    Returns the price, quantity and offset columns of the carts.
+    """
+    prices = array("d")
+    quantities = array("q")
+    for cart in carts:
+        for line in cart.lines.values():
+            prices.append(line["product"].price)
+            quantities.append(line["quantity"])
+    offsets = array("q", accumulate((len(cart) for cart in carts), initial=0))
+    return prices, quantities, offsets
+
+
+def checkout_each(carts):
+    """
+    Checks out every cart with its printing checkout method.
+    """
+    with open(os.devnull, "w", encoding="utf-8") as sink:
+        with redirect_stdout(sink):
+            for cart in carts:
+                cart.checkout()
+
+
+def main():
+    """
+    Prints the timings of the three checkouts.
+    """
+    parser = argparse.ArgumentParser(description="Batch checkout benchmark.")
+    parser.add_argument("--carts", type=int, default=1000000)
+    parser.add_argument("--max-lines", type=int, default=4)
+    args = parser.parse_args()
+
+    carts = build_carts(args.carts, args.max_lines, random.Random(0))
+    columns = flatten(carts)
+    print(f"{args.carts:,} carts, {len(columns[0]):,} lines")
+    timings = (
+        ("ShoppingCart.checkout", best_time(checkout_each, carts, repeat=1)),
+        ("checkout_carts", best_time(checkout_carts, carts)),
+        ("checkout_totals", best_time(checkout_totals, *columns)),
+    )
+    for name, seconds in timings:
+        print(f"  {name}: {seconds:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+"""
+Latency of fetch_data_from_api through its shared pooled session against a
+new connection per request, as a bare requests.get makes, measured on a local
+stand-in for the external API.
+
+Run from the repository root with ``python -m benchmarks.bench_http``.
+Pass ``--connect-delay`` to add the round trip a remote host would cost on
+each new connection.
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from src.mockup_exercises import fetch_data_from_api
+
+PAYLOAD = json.dumps({"status": "ok", "items": list(range(20))}).encode()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Answers every GET with a small JSON document over keep-alive connections.
+    """
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes, which Nagle's algorithm
+    # would otherwise hold back until the client's delayed ACK.
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        """
+        Counts the new connection and waits out the simulated handshake.
+        """
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+        time.sleep(self.server.connect_delay)
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """
+        Sends the JSON payload.
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(PAYLOAD)))
+        self.end_headers()
+        self.wfile.write(PAYLOAD)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """
+        Keeps the request log out of the benchmark output.
+        """
+
+
+def start_server(connect_delay):
+    """
+    Starts the stand-in server on a free local port in a background thread.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.connections = 0
+    server.connect_delay = connect_delay
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def fetch_without_pool(url):
+    """
+    Fetches the url over a new connection, the way fetch_data_from_api did
+    before it shared a session.
+    """
+    return requests.get(url, timeout=10).json()
+
+
+def measure(server, fetch, url, count):
+    """
+    Fetches the url ``count`` times, returning the mean latency in
+    milliseconds and the number of connections the server accepted.
+    """
+    with server.lock:
+        server.connections = 0
+    start = time.perf_counter()
+    for _ in range(count):
+        fetch(url)
+    elapsed = time.perf_counter() - start
+    with server.lock:
+        return elapsed / count * 1000, server.connections
+
+
+def main():
+    """
+    Prints the latency and connection count with and without the pool.
+    """
+    parser = argparse.ArgumentParser(description="Connection reuse benchmark.")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--connect-delay", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = start_server(args.connect_delay)
+    url = f"http://127.0.0.1:{server.server_address[1]}/data"
+    try:
+        results = {
+            "new connection": measure(server, fetch_without_pool, url, args.requests),
+            "shared session": measure(server, fetch_data_from_api, url, args.requests),
+        }
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    for name, (latency, connections) in results.items():
+        print(f"{name:>14}: {latency:>7.3f} ms/request, {connections:>5} connections")
+
+
+if __name__ == "__main__":
+    main()
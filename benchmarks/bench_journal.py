@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+"""
+Journaled transfers per second for different group-commit sizes, and the time
+to recover the balances from the journal.
+
+Run from the repository root with ``python -m benchmarks.bench_journal``.
+Pass ``--directory`` to put the journal on the disk being measured.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from src.ledger import TransactionJournal
+from src.white_box import BankingSystem
+
+
+def measure(directory, group_size, transfers):
+    """
+    Settles the transfers in batches of ``group_size``, one fsync per batch,
+    returning the transfers per second and the seconds taken to restore them.
+    """
+    path = os.path.join(directory, f"group-{group_size}.journal")
+    banking_system = BankingSystem(default_balance=10**9)
+    banking_system.logged_in_users.add("alice")
+    batch = [("alice", "bob", 1, "regular")] * group_size
+
+    start = time.perf_counter()
+    with TransactionJournal(path, group_size) as journal:
+        banking_system.journal = journal
+        for _ in range(transfers // group_size):
+            banking_system.settle(batch)
+    elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    BankingSystem(default_balance=10**9).restore(path)
+    restore_time = time.perf_counter() - start
+    os.remove(path)
+    return transfers / elapsed, restore_time
+
+
+def main():
+    """
+    Prints the throughput and recovery time for each group size.
+    """
+    parser = argparse.ArgumentParser(description="Transaction journal benchmark.")
+    parser.add_argument("--transfers", type=int, default=20000)
+    parser.add_argument("--group-sizes", type=int, nargs="+", default=[1, 8, 64, 512])
+    parser.add_argument("--directory", default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.directory) as directory:
+        for group_size in args.group_sizes:
+            throughput, restore_time = measure(directory, group_size, args.transfers)
+            print(
+                f"group size {group_size:>4}: {throughput:>10,.0f} transfers/s,"
+                f" {throughput / group_size:>8,.0f} commits/s,"
+                f" restored in {restore_time:.3f} s"
+            )
+
+
+if __name__ == "__main__":
+    main()
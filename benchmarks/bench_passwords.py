@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+"""
+Single-sweep password validation against the previous four regex searches.
+
+Run from the repository root with ``python -m benchmarks.bench_passwords``.
+"""
+import argparse
+import io
+import random
+import re
+import string
+
+from benchmarks.common import best_time
+from src.white_box import validate_password, validate_passwords
+
+ALPHABET = string.ascii_letters + string.digits + "!@#$%&"
+
+
+def regex_validate_password(password):
+    """
+    The previous validate_password, one re.search per character class.
+    """
+    if len(password) < 8:
+        return False
+
+    if (
+        not re.search(r"[A-Z]", password)
+        or not re.search(r"[a-z]", password)
+        or not re.search(r"\d", password)
+        or not re.search(r"[!@#$%&]", password)
+    ):
+        return False
+
+    return True
+
+
+def validate_all(validate, passwords):
+    """
+    Validates every password with ``validate``.
+    """
+    return [validate(password) for password in passwords]
+
+
+def validate_file(text):
+    """
+    Validates every line of a credential file with validate_passwords.
+    """
+    return list(validate_passwords(io.StringIO(text)))
+
+
+def main():
+    """
+    Prints the timings of both validators.
+    """
+    parser = argparse.ArgumentParser(description="Password validation benchmark.")
+    parser.add_argument("--passwords", type=int, default=1000000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    passwords = [
+        "".join(rng.choices(ALPHABET, k=rng.randint(6, 16)))
+        for _ in range(args.passwords)
+    ]
+    if validate_all(validate_password, passwords) != validate_all(
+        regex_validate_password, passwords
+    ):
+        raise AssertionError("The validators disagree")
+
+    text = "\n".join(passwords) + "\n"
+    print(f"{args.passwords:,} passwords")
+    timings = (
+        (
+            "four re.search calls",
+            best_time(validate_all, regex_validate_password, passwords),
+        ),
+        ("validate_password", best_time(validate_all, validate_password, passwords)),
+        ("validate_passwords on a file", best_time(validate_file, text)),
+    )
+    for name, seconds in timings:
+        print(f"  {name}: {seconds:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+"""
+Pricing order lines and packages one at a time against pricing them as columns.
+
+Run from the repository root with ``python -m benchmarks.bench_pricing``.
+"""
+import argparse
+import random
+
+from benchmarks.common import best_time
+from src.white_box import (
+    calculate_line_totals,
+    calculate_order_total,
+    calculate_packages_shipping_cost,
+    calculate_shipping_cost,
+)
+
+
+def price_orders(orders):
+    """
+    Prices every order with the per-order function.
+    """
+    return [calculate_order_total(items) for items in orders]
+
+
+def bench_order_totals(line_count, order_size, rng):
+    """
+    Prints the timings of calculate_order_total and calculate_line_totals.
+    """
+    quantities = [rng.randint(1, 15) for _ in range(line_count)]
+    prices = [round(rng.uniform(1, 100), 2) for _ in range(line_count)]
+    orders = [
+        [
+            {"quantity": quantity, "price": price}
+            for quantity, price in zip(
+                quantities[start : start + order_size],
+                prices[start : start + order_size],
+            )
+        ]
+        for start in range(0, line_count, order_size)
+    ]
+    print(f"{line_count:,} order lines")
+    print(f"  calculate_order_total: {best_time(price_orders, orders):.3f} s")
+    print(
+        "  calculate_line_totals: "
+        f"{best_time(calculate_line_totals, quantities, prices):.3f} s"
+    )
+
+
+def price_packages(weights, lengths, widths, heights):
+    """
+    Prices every package with the per-package function.
+    """
+    return list(map(calculate_shipping_cost, weights, lengths, widths, heights))
+
+
+def bench_shipping(package_count, rng):
+    """
+    Prints the timings of calculate_shipping_cost and
+    calculate_packages_shipping_cost.
+    """
+    columns = (
+        [rng.uniform(0, 8) for _ in range(package_count)],
+        *([rng.randint(1, 40) for _ in range(package_count)] for _ in range(3)),
+    )
+    print(f"{package_count:,} packages")
+    print(f"  calculate_shipping_cost: {best_time(price_packages, *columns):.3f} s")
+    print(
+        "  calculate_packages_shipping_cost: "
+        f"{best_time(calculate_packages_shipping_cost, *columns):.3f} s"
+    )
+
+
+def main():
+    """
+    Runs the pricing benchmarks.
+    """
+    parser = argparse.ArgumentParser(description="Batch pricing benchmarks.")
+    parser.add_argument("--lines", type=int, default=1000000)
+    parser.add_argument("--order-size", type=int, default=5)
+    parser.add_argument("--packages", type=int, default=1000000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    bench_order_totals(args.lines, args.order_size, rng)
+    bench_shipping(args.packages, rng)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+
+"""
+Helpers shared by the benchmark scripts.
+"""
+import threading
+import time
+
+
+def best_time(function, *args, repeat=3):
+    """
+    Returns the fastest of ``repeat`` timed calls, in seconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run_threads(target, thread_count):
+    """
+    Runs ``target(worker)`` in ``thread_count`` threads, returning the seconds
+    from starting the first one to joining the last one.
+    """
+    threads = [
+        threading.Thread(target=target, args=(worker,))
+        for worker in range(thread_count)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
@@ -3,6 +3,45 @@
 """
 Book store example.
 """
+import asyncio
+import csv
+import heapq
+import io
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from itertools import groupby, islice
+
+NGRAM_SIZE = 3
+BOOK_FIELDS = ("title", "author", "price", "quantity")
+# Longest request line the service accepts, large enough for batched adds.
+REQUEST_SIZE_LIMIT = 16 * 1024 * 1024
+
+_SNAPSHOT_MAGIC = b"BKS1"
+_SNAPSHOT_HEADER = struct.Struct("<4sQ")
+_SNAPSHOT_RECORD = struct.Struct("<dqII")
+# Range of the signed 64-bit quantity field of snapshot records.
+_QUANTITY_MIN = -(2**63)
+_QUANTITY_MAX = 2**63 - 1
+
+
+def _substrings(text, size):
+    """Returns every substring of ``text`` that is ``size`` characters long."""
+    return {text[start : start + size] for start in range(len(text) - size + 1)}
+
+
+def _ngrams(text):
+    """Returns the ``NGRAM_SIZE`` character substrings of ``text``, or the text if shorter."""
+    if len(text) < NGRAM_SIZE:
+        return {text} if text else set()
+    return _substrings(text, NGRAM_SIZE)
 
 
 class Book:  # pylint: disable=too-few-public-methods
@@ -10,12 +49,18 @@ class Book:  # pylint: disable=too-few-public-methods
     Book class.
     """
 
+    # Slots drop the per-instance __dict__, and interning shares the storage
+    # of repeated titles and authors across the catalogue.
+    __slots__ = ("title", "author", "price", "quantity", "position")
+
     def __init__(self, title, author, price, quantity):
         """Book init."""
-        self.title = title
-        self.author = author
+        self.title = sys.intern(title)
+        self.author = sys.intern(author)
         self.price = price
         self.quantity = quantity
+        # Index of the book in the store it was added to.
+        self.position = None
 
     def display(self):
         """Displays the book information."""
@@ -25,7 +70,103 @@ class Book:  # pylint: disable=too-few-public-methods
         print(f"Quantity: {self.quantity}")
 
 
-class BookStore:
+def _book_row(book):
+    """Returns the book fields in ``BOOK_FIELDS`` order."""
+    return (book.title, book.author, book.price, book.quantity)
+
+
+def _render_plain(rows):
+    """Renders book rows the same way ``Book.display`` prints them."""
+    return "".join(
+        f"Title: {title}\nAuthor: {author}\nPrice: ${price}\nQuantity: {quantity}\n"
+        for title, author, price, quantity in rows
+    )
+
+
+def _render_csv(rows):
+    """Renders book rows as CSV lines."""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+def _render_jsonl(rows):
+    """Renders book rows as JSON lines."""
+    return "".join(json.dumps(dict(zip(BOOK_FIELDS, row))) + "\n" for row in rows)
+
+
+_RENDERERS = {"plain": _render_plain, "csv": _render_csv, "jsonl": _render_jsonl}
+
+
+def iter_books_csv(file):
+    """Streams books from a CSV file with a title/author/price/quantity header."""
+    for row in csv.DictReader(file):
+        yield Book(
+            row["title"], row["author"], float(row["price"]), int(row["quantity"])
+        )
+
+
+def iter_books_jsonl(file):
+    """Streams books from a JSON lines file, skipping blank lines."""
+    for line in file:
+        if line.strip():
+            record = json.loads(line)
+            yield Book(*(record[field] for field in BOOK_FIELDS))
+
+
+def iter_books_snapshot(path):
+    """
+    Streams books from a binary snapshot written by ``BookStore.save_snapshot``.
+    The file is memory-mapped, so only the records being read are paged in.
+    """
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as snapshot:
+            magic, count = _SNAPSHOT_HEADER.unpack_from(snapshot)
+            if magic != _SNAPSHOT_MAGIC:
+                raise ValueError(f"'{path}' is not a book store snapshot.")
+            offset = _SNAPSHOT_HEADER.size
+            for _ in range(count):
+                price, quantity, title_size, author_size = _SNAPSHOT_RECORD.unpack_from(
+                    snapshot, offset
+                )
+                offset += _SNAPSHOT_RECORD.size
+                title = snapshot[offset : offset + title_size].decode("utf-8")
+                offset += title_size
+                author = snapshot[offset : offset + author_size].decode("utf-8")
+                offset += author_size
+                yield Book(title, author, price, quantity)
+
+
+def _folded_key(text):
+    """Returns the case-folded text, reusing ``text`` when folding leaves it equal."""
+    folded = text.casefold()
+    return text if folded == text else folded
+
+
+def _index_add(index, key, book):
+    """Files a book under ``key``, a lone match is stored without a list."""
+    found = index.get(key)
+    if found is None:
+        index[key] = book
+    elif isinstance(found, list):
+        found.append(book)
+    else:
+        index[key] = [found, book]
+
+
+def _index_lookup(index, key):
+    """Returns a new list of the books filed under ``key``."""
+    found = index.get(key)
+    if found is None:
+        return []
+    if isinstance(found, list):
+        return list(found)
+    return [found]
+
+
+class BookStore:  # pylint: disable=too-many-instance-attributes
     """
     Book store class.
     """
@@ -33,26 +174,223 @@ class BookStore:
     def __init__(self):
         """Book class init."""
         self.books = []
+        self._title_index = {}
+        self._author_index = {}
+        self._ngram_index = {}
+        self._ngram_indexed = 0
+        self._short_grams = {}
+        self._out_of_stock = {}
+        # Price index as parallel price and position columns, sorted lazily.
+        self._prices = array("d")
+        self._price_positions = array("I")
+        self._price_index_sorted = True
+        self.total_value = 0
+        self.total_units = 0
+
+    def _index_book(self, book):
+        """
+        Appends a book, registering it in the indexes and the inventory aggregates.
+        The aggregates are computed first, so a book with mistyped fields raises
+        before anything is stored.
+        """
+        total_value = self.total_value + book.price * book.quantity
+        total_units = self.total_units + book.quantity
+        out_of_stock = book.quantity <= 0
+        position = len(self.books)
+        # The price column is appended first, it rejects non-numeric prices.
+        self._prices.append(book.price)
+        self._price_positions.append(position)
+        self._price_index_sorted = False
+        self.books.append(book)
+        book.position = position
+        _index_add(self._title_index, _folded_key(book.title), book)
+        _index_add(self._author_index, _folded_key(book.author), book)
+        self.total_value = total_value
+        self.total_units = total_units
+        if out_of_stock:
+            self._out_of_stock[position] = book
+
+    def _index_ngrams(self):
+        """
+        Brings the n-gram index up to date with the books added since the last
+        search. Building it on demand keeps bulk loads and startup cheap.
+        """
+        for position in range(self._ngram_indexed, len(self.books)):
+            book = self.books[position]
+            grams = _ngrams(book.title.casefold()) | _ngrams(book.author.casefold())
+            for gram in grams:
+                postings = self._ngram_index.get(gram)
+                if postings is None:
+                    postings = self._ngram_index[gram] = array("I")
+                    # Queries shorter than an n-gram find it through its substrings.
+                    for size in range(1, NGRAM_SIZE):
+                        for short in _substrings(gram, size):
+                            self._short_grams.setdefault(short, []).append(gram)
+                postings.append(position)
+        self._ngram_indexed = len(self.books)
 
     def add_book(self, book):
         """Adds a book to the store."""
-        self.books.append(book)
+        self._index_book(book)
         print(f"Book '{book.title}' added to the store.")
 
+    def add_books(self, books):
+        """Adds many books to the store without printing, returns how many."""
+        count = len(self.books)
+        for book in books:
+            self._index_book(book)
+        return len(self.books) - count
+
+    def update_quantity(self, book, quantity):
+        """Changes the stock of a book already in the store."""
+        position = book.position
+        if (
+            position is None
+            or position >= len(self.books)
+            or (self.books[position] is not book)
+        ):
+            # The book was added to another store since, find it by scanning.
+            position = self.books.index(book)
+        self.total_value += book.price * (quantity - book.quantity)
+        self.total_units += quantity - book.quantity
+        book.quantity = quantity
+        if quantity <= 0:
+            self._out_of_stock[position] = book
+        else:
+            self._out_of_stock.pop(position, None)
+
+    def count_books_by_author(self, author):
+        """Returns how many books of the author are in the store, ignoring case."""
+        found = self._author_index.get(author.casefold())
+        if found is None:
+            return 0
+        return len(found) if isinstance(found, list) else 1
+
+    def out_of_stock_books(self):
+        """Returns the books without stock, in insertion order."""
+        return [self._out_of_stock[position] for position in sorted(self._out_of_stock)]
+
+    def _sort_price_index(self):
+        """
+        Sorts the price columns by price. The sort is stable, so books of the
+        same price stay in insertion order.
+        """
+        prices = self._prices
+        order = sorted(range(len(prices)), key=prices.__getitem__)
+        self._prices = array("d", map(prices.__getitem__, order))
+        self._price_positions = array(
+            "I", map(self._price_positions.__getitem__, order)
+        )
+        self._price_index_sorted = True
+
+    def find_books_by_price(self, low, high):
+        """Lazily yields the books priced between ``low`` and ``high``, cheapest first."""
+        if not self._price_index_sorted:
+            self._sort_price_index()
+        prices = self._prices
+        start = bisect_left(prices, low)
+        stop = bisect_right(prices, high, start)
+        for position in self._price_positions[start:stop]:
+            yield self.books[position]
+
+    def write_books(
+        self, stream, fmt="plain", start=0, limit=None, batch_size=1000
+    ):  # pylint: disable=too-many-arguments
+        """
+        Streams a page of books to a text stream as plain text, CSV or JSON lines.
+        Books are rendered in batches so each batch is a single write call.
+        Returns the number of books written.
+        """
+        if fmt not in _RENDERERS:
+            raise ValueError(f"Unsupported format '{fmt}'.")
+        render = _RENDERERS[fmt]
+        if fmt == "csv":
+            stream.write(render([BOOK_FIELDS]))
+        stop = len(self.books) if limit is None else min(start + limit, len(self.books))
+        rows = (_book_row(self.books[index]) for index in range(start, stop))
+        written = 0
+        while batch := list(islice(rows, batch_size)):
+            stream.write(render(batch))
+            written += len(batch)
+        return written
+
+    def save_snapshot(self, path):
+        """Writes the catalogue to a binary snapshot, replacing ``path`` atomically."""
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(_SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, len(self.books)))
+            for book in self.books:
+                title = book.title.encode("utf-8")
+                author = book.author.encode("utf-8")
+                file.write(
+                    _SNAPSHOT_RECORD.pack(
+                        book.price, book.quantity, len(title), len(author)
+                    )
+                )
+                file.write(title)
+                file.write(author)
+        os.replace(temp_path, path)
+
+    def find_books_by_title(self, title):
+        """Returns the books whose title matches, ignoring case."""
+        return _index_lookup(self._title_index, title.casefold())
+
+    def find_books_by_author(self, author):
+        """Returns the books whose author matches, ignoring case."""
+        return _index_lookup(self._author_index, author.casefold())
+
+    def _iter_matches(self, query, matches):
+        """Yields the books whose case-folded title or author satisfies ``matches``."""
+        if not query:
+            yield from self.books
+            return
+        self._index_ngrams()
+        if len(query) >= NGRAM_SIZE:
+            # The rarest n-gram of the query gives the shortest postings list;
+            # its candidates still need checking since n-grams only narrow the
+            # search.
+            postings = min(
+                (
+                    self._ngram_index.get(gram, ())
+                    for gram in _substrings(query, NGRAM_SIZE)
+                ),
+                key=len,
+            )
+        else:
+            # Short queries merge the postings of every n-gram containing them,
+            # dropping the positions found through several n-grams.
+            merged = heapq.merge(
+                *(self._ngram_index[gram] for gram in self._short_grams.get(query, ()))
+            )
+            postings = (position for position, _ in groupby(merged))
+        for position in postings:
+            book = self.books[position]
+            if matches(book.title.casefold()) or matches(book.author.casefold()):
+                yield book
+
+    def search_prefix(self, prefix, limit=None):
+        """Lazily yields up to ``limit`` books whose title or author starts with ``prefix``."""
+        prefix = prefix.casefold()
+        return islice(
+            self._iter_matches(prefix, lambda text: text.startswith(prefix)), limit
+        )
+
+    def search_substring(self, query, limit=None):
+        """Lazily yields up to ``limit`` books whose title or author contains ``query``."""
+        query = query.casefold()
+        return islice(self._iter_matches(query, lambda text: query in text), limit)
+
     def display_books(self):
         """Displays all books available in the store."""
         if not self.books:
             print("No books in the store.")
         else:
             print("Books available in the store:")
-            for book in self.books:
-                book.display()
+            self.write_books(sys.stdout)
 
     def search_book(self, title):
         """Searches a books in the store."""
-        found_books = [
-            book for book in self.books if book.title.lower() == title.lower()
-        ]
+        found_books = self.find_books_by_title(title)
         if not found_books:
             print(f"No book found with title '{title}'.")
         else:
@@ -61,9 +399,278 @@ class BookStore:
                 book.display()
 
 
-def main():
-    """Application entrypoint."""
+class ReadWriteLock:
+    """
+    Lock shared by many readers or held by a single writer.
+    Writers take precedence: once one is waiting, new readers wait for it so
+    a steady stream of readers cannot starve it.
+    """
+
+    def __init__(self):
+        """Read write lock init."""
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        """Holds the lock for reading."""
+        with self._condition:
+            self._condition.wait_for(lambda: not self._writers_waiting)
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        """Holds the lock for writing, new readers wait until it is released."""
+        with self._condition:
+            self._writers_waiting += 1
+            try:
+                self._condition.wait_for(lambda: not self._readers)
+            finally:
+                self._writers_waiting -= 1
+            try:
+                yield
+            finally:
+                self._condition.notify_all()
+
+
+class ConcurrentBookStore(BookStore):
+    """
+    Book store safe to share between threads.
+    Lookups run in parallel under a read lock while inserts and stock changes
+    take the write lock. Lazy search results are materialised under the lock,
+    and lookups whose index is built lazily take the write lock to update it.
+    """
+
+    def __init__(self):
+        """Concurrent book store init."""
+        super().__init__()
+        self._lock = ReadWriteLock()
+
+    @contextmanager
+    def _read_indexed(self, is_indexed):
+        """
+        Holds the read lock, or the write lock when ``is_indexed`` reports that
+        a lazily built index has to be updated first.
+        """
+        with self._lock.read():
+            if is_indexed():
+                yield
+                return
+        with self._lock.write():
+            yield
+
+    def _ngrams_indexed(self):
+        """Checks the n-gram index covers every book."""
+        return self._ngram_indexed == len(self.books)
+
+    def _prices_indexed(self):
+        """Checks the price index is sorted."""
+        return self._price_index_sorted
+
+    def add_book(self, book):
+        """Adds a book to the store."""
+        with self._lock.write():
+            super().add_book(book)
+
+    def add_books(self, books):
+        """Adds many books to the store without printing, returns how many."""
+        books = list(books)
+        with self._lock.write():
+            return super().add_books(books)
+
+    def update_quantity(self, book, quantity):
+        """Changes the stock of a book already in the store."""
+        with self._lock.write():
+            super().update_quantity(book, quantity)
+
+    def find_books_by_title(self, title):
+        """Returns the books whose title matches, ignoring case."""
+        with self._lock.read():
+            return super().find_books_by_title(title)
+
+    def find_books_by_author(self, author):
+        """Returns the books whose author matches, ignoring case."""
+        with self._lock.read():
+            return super().find_books_by_author(author)
+
+    def search_prefix(self, prefix, limit=None):
+        """Returns up to ``limit`` books whose title or author starts with ``prefix``."""
+        with self._read_indexed(self._ngrams_indexed):
+            return list(super().search_prefix(prefix, limit))
+
+    def search_substring(self, query, limit=None):
+        """Returns up to ``limit`` books whose title or author contains ``query``."""
+        with self._read_indexed(self._ngrams_indexed):
+            return list(super().search_substring(query, limit))
+
+    def count_books_by_author(self, author):
+        """Returns how many books of the author are in the store, ignoring case."""
+        with self._lock.read():
+            return super().count_books_by_author(author)
+
+    def out_of_stock_books(self):
+        """Returns the books without stock, in insertion order."""
+        with self._lock.read():
+            return super().out_of_stock_books()
+
+    def find_books_by_price(self, low, high):
+        """Returns the books priced between ``low`` and ``high``, cheapest first."""
+        with self._read_indexed(self._prices_indexed):
+            return list(super().find_books_by_price(low, high))
+
+    def write_books(
+        self, stream, fmt="plain", start=0, limit=None, batch_size=1000
+    ):  # pylint: disable=too-many-arguments
+        """Streams a page of books to a text stream, see ``BookStore.write_books``."""
+        with self._lock.read():
+            return super().write_books(stream, fmt, start, limit, batch_size)
+
+    def save_snapshot(self, path):
+        """Writes the catalogue to a binary snapshot, replacing ``path`` atomically."""
+        with self._lock.read():
+            super().save_snapshot(path)
+
+
+def _book_from_record(record):
+    """
+    Builds a book from a request record, converting the price and quantity.
+    Raises TypeError or ValueError for fields that do not fit a book.
+    """
+    title, author, price, quantity = (record[field] for field in BOOK_FIELDS)
+    if not isinstance(title, str) or not isinstance(author, str):
+        raise TypeError("The title and author must be strings.")
+    price = float(price)
+    if not math.isfinite(price):
+        raise ValueError(f"Invalid price {price!r}.")
+    if isinstance(quantity, float) and not quantity.is_integer():
+        raise ValueError(f"Invalid quantity {quantity!r}.")
+    quantity = int(quantity)
+    if not _QUANTITY_MIN <= quantity <= _QUANTITY_MAX:
+        raise ValueError(f"Invalid quantity {quantity!r}.")
+    return Book(title, author, price, quantity)
+
+
+def handle_request(bookstore, request):
+    """
+    Runs one menu command and returns its JSON-serialisable response.
+    The ``choice`` key follows the CLI menu: "1" lists a page of books, "2"
+    searches by title, "3" adds a book or a ``books`` batch and "4" exits.
+    """
+    choice = request.get("choice")
+    if choice == "1":
+        start = request.get("start", 0)
+        limit = request.get("limit", len(bookstore.books))
+        books = bookstore.books[start : start + limit]
+    elif choice == "2":
+        books = bookstore.find_books_by_title(request["title"])
+    elif choice == "3":
+        records = request.get("books", [request])
+        # Every record is checked before any is added, so a bad one rejects
+        # the whole batch.
+        books = [_book_from_record(record) for record in records]
+        return {"added": bookstore.add_books(books)}
+    elif choice == "4":
+        return {"message": "Exiting..."}
+    else:
+        return {"error": "Invalid choice. Please try again."}
+    return {"books": [dict(zip(BOOK_FIELDS, _book_row(book))) for book in books]}
+
+
+async def _read_request(reader):
+    """
+    Returns the next request line, ``b""`` at the end of the stream or None
+    after skipping a line longer than the stream limit.
+    """
+    try:
+        return await reader.readuntil(b"\n")
+    except asyncio.IncompleteReadError as e:
+        return e.partial
+    except asyncio.LimitOverrunError as e:
+        consumed = e.consumed
+    # Drop the oversized line chunk by chunk, so the next request stays intact.
+    while True:
+        try:
+            await reader.readexactly(consumed)
+            await reader.readuntil(b"\n")
+            return None
+        except asyncio.IncompleteReadError:
+            return None
+        except asyncio.LimitOverrunError as e:
+            consumed = e.consumed
+
+
+async def _serve_client(bookstore, reader, writer):
+    """Answers the JSON lines requests of a client in the order they arrive."""
+    try:
+        while (line := await _read_request(reader)) != b"":
+            try:
+                if line is None:
+                    raise ValueError("request is longer than the size limit")
+                request = json.loads(line)
+                response = handle_request(bookstore, request)
+            except (KeyError, TypeError, ValueError, AttributeError) as e:
+                request, response = {}, {"error": f"Invalid request: {e!r}"}
+            writer.write(json.dumps(response).encode("utf-8") + b"\n")
+            await writer.drain()
+            if request.get("choice") == "4":
+                break
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def start_service(
+    bookstore, host="127.0.0.1", port=8765, limit=REQUEST_SIZE_LIMIT
+):
+    """
+    Starts serving the book store over TCP, one JSON request per line.
+    Clients may pipeline requests, responses come back in the same order.
+    Requests longer than ``limit`` bytes are skipped with an error response.
+    """
+    return await asyncio.start_server(
+        lambda reader, writer: _serve_client(bookstore, reader, writer),
+        host,
+        port,
+        limit=limit,
+    )
+
+
+def serve(host="127.0.0.1", port=8765, catalogue_path=None):
+    """Service entrypoint, runs until interrupted."""
+    bookstore = BookStore()
+    if catalogue_path and os.path.exists(catalogue_path):
+        bookstore.add_books(iter_books_snapshot(catalogue_path))
+
+    async def run():
+        async with await start_service(bookstore, host, port) as server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if catalogue_path:
+            bookstore.save_snapshot(catalogue_path)
+
+
+def main(catalogue_path=None):
+    """
+    Application entrypoint.
+    When a catalogue path is given the books are loaded from it on start and
+    saved back to it on exit.
+    """
     bookstore = BookStore()
+    if catalogue_path and os.path.exists(catalogue_path):
+        bookstore.add_books(iter_books_snapshot(catalogue_path))
 
     while True:
         print(
@@ -84,6 +691,8 @@ def main():
             new_book = Book(title, author, price, quantity)
             bookstore.add_book(new_book)
         elif choice == "4":
+            if catalogue_path:
+                bookstore.save_snapshot(catalogue_path)
             print("Exiting...")
             break
         else:
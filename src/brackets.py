@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+"""
+Table-driven brackets for threshold based classifications.
+"""
+import math
+from bisect import bisect_left
+
+
+class ExclusiveBound:  # pylint: disable=too-few-public-methods
+    """
+    Bracket end that excludes its value, made by ``above`` and ``below``.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        """
+        Keeps the excluded value.
+        """
+        self.value = value
+
+
+def _bound(bound):
+    """
+    Returns the value of a bracket end and whether it is excluded.
+    """
+    if isinstance(bound, ExclusiveBound):
+        return bound.value, True
+
+    return bound, False
+
+
+class BracketTable:
+    """
+    Maps numbers to labels through sorted [low, high] brackets.
+    Both ends are inclusive unless given through ``above`` or ``below``.
+    Values outside every bracket get the default label. A label may itself be
+    a BracketTable, which then classifies the next value of the lookup.
+
+    The brackets are kept as the sorted points where the label changes. A cut
+    at a point either lies before it, so the point belongs to the next
+    segment, or after it. A value is bisected to the first cut at or above it
+    and moved past the cuts lying before its own point.
+    """
+
+    def __init__(self, brackets, default):
+        """
+        Sorts the (low, high, label) brackets and checks they do not overlap.
+        """
+        brackets = sorted(
+            (_bound(low) + _bound(high) + (label,) for low, high, label in brackets),
+            key=lambda bracket: (bracket[0], bracket[1]),
+        )
+        previous_high, previous_open = None, True
+        for low, low_open, high, high_open, _ in brackets:
+            if high < low or (high == low and (low_open or high_open)):
+                raise ValueError("Brackets must not be empty")
+            if previous_high is not None and (
+                low < previous_high
+                or (low == previous_high and not (low_open or previous_open))
+            ):
+                raise ValueError("Brackets must not overlap")
+            previous_high, previous_open = high, high_open
+
+        # Cut points sorted by (point, lies after it), and the label of each
+        # segment between them.
+        cuts = []
+        self.labels = [default]
+        for low, low_open, high, high_open, label in brackets:
+            cuts.append((low, low_open))
+            self.labels.append(label)
+            cuts.append((high, not high_open))
+            self.labels.append(default)
+        # A closing cut lying after infinity keeps every bisect on a point.
+        cuts.append((math.inf, True))
+        self.points = [point for point, _ in cuts]
+        # Number of cuts lying before the point of each cut, counted from the
+        # first cut at that point.
+        self.cuts_before = [
+            sum(1 for other, after in cuts[index:] if other == point and not after)
+            for index, (point, _) in enumerate(cuts)
+        ]
+        self.default = default
+        self._nested = any(isinstance(label, BracketTable) for label in self.labels)
+
+    def lookup(self, value):
+        """
+        Returns the label of the bracket containing the value.
+        """
+        points = self.points
+        index = bisect_left(points, value)
+        if points[index] == value:
+            index += self.cuts_before[index]
+        return self.labels[index]
+
+    def lookup_many(self, values):
+        """
+        Returns the label of each value, see ``lookup``.
+        """
+        points, cuts_before, labels = self.points, self.cuts_before, self.labels
+        results = []
+        append = results.append
+        for value in values:
+            index = bisect_left(points, value)
+            if points[index] == value:
+                index += cuts_before[index]
+            append(labels[index])
+        return results
+
+    def classify(self, *values):
+        """
+        Looks up the first value, following nested tables with the next values.
+        """
+        label = self.lookup(values[0])
+        if isinstance(label, BracketTable):
+            return label.classify(*values[1:])
+
+        return label
+
+    def classify_many(self, *columns):
+        """
+        Classifies a batch of values given as one column per lookup level.
+        The first column is looked up in one pass, only the rows landing in a
+        nested table go on to the next columns.
+        """
+        results = self.lookup_many(columns[0])
+        if self._nested:
+            rest = columns[1:]
+            for index, label in enumerate(results):
+                if isinstance(label, BracketTable):
+                    results[index] = label.classify(*(column[index] for column in rest))
+        return results
+
+
+def above(value):
+    """
+    Low end of a bracket that excludes the value itself.
+    """
+    return ExclusiveBound(value)
+
+
+def below(value):
+    """
+    High end of a bracket that excludes the value itself.
+    """
+    return ExclusiveBound(value)
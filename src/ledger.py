@@ -0,0 +1,377 @@
+# -*- coding: utf-8 -*-
+
+"""
+In-memory account ledger for money transfers, with a write-ahead journal.
+"""
+import enum
+import math
+import os
+import struct
+import threading
+import zlib
+from array import array
+
+# Fee rate charged to the sender for each transaction type.
+TRANSACTION_FEES = {"regular": 0.02, "express": 0.05, "scheduled": 0.01}
+TRANSACTION_TYPES = tuple(TRANSACTION_FEES)
+
+# Journal record: CRC32 of the rest of the record, then the amount, the
+# transaction type index and the sizes of the UTF-8 sender and receiver that
+# follow them.
+_JOURNAL_CHECKSUM = struct.Struct("<I")
+_JOURNAL_ENTRY = struct.Struct("<dBHH")
+_SNAPSHOT_MAGIC = b"LDG1"
+_SNAPSHOT_HEADER = struct.Struct("<4sQQ")
+_SNAPSHOT_ACCOUNT = struct.Struct("<dH")
+# Longest UTF-8 account number the size fields of the records can hold.
+_ACCOUNT_SIZE_LIMIT = 0xFFFF
+
+
+class TransferStatus(enum.Enum):
+    """
+    Outcome of a transfer, the value is the message shown to users.
+    """
+
+    PROCESSED = "Transfer processed."
+    NOT_AUTHENTICATED = "Sender not authenticated."
+    INVALID_TYPE = "Invalid transaction type."
+    INVALID_AMOUNT = "Invalid transfer amount."
+    INSUFFICIENT_FUNDS = "Insufficient funds."
+
+
+class AccountLedger:
+    """
+    Balances of every account, kept in a single array of floats.
+    Accounts that are not opened explicitly are opened on first use with the
+    default balance.
+    """
+
+    def __init__(self, default_balance=0):
+        """
+        Initialize the empty ledger.
+        """
+        self.default_balance = default_balance
+        self.balances = array("d")
+        self.slots = {}
+        self.fees = dict.fromkeys(TRANSACTION_FEES, 0.0)
+
+    def __len__(self):
+        """
+        Number of open accounts.
+        """
+        return len(self.balances)
+
+    def open_account(self, account_number, balance=None):
+        """
+        Opens an account, returning its slot in the balances array.
+        """
+        slot = self.slots.get(account_number)
+        if slot is None:
+            slot = self.slots[account_number] = len(self.balances)
+            self.balances.append(self.default_balance if balance is None else balance)
+        return slot
+
+    def balance(self, account_number):
+        """
+        Returns the balance of an account.
+        """
+        return self.balances[self.open_account(account_number)]
+
+    def transfer(self, sender, receiver, amount, transaction_type):
+        """
+        Moves money between accounts, charging the transaction fee to the sender.
+        The amount must be positive and finite. Nothing changes unless the
+        transfer succeeds. Returns a TransferStatus.
+        """
+        rate = TRANSACTION_FEES.get(transaction_type)
+        if rate is None:
+            return TransferStatus.INVALID_TYPE
+        # A negative amount would pull money out of the receiver, and NaN
+        # would slip past the funds check.
+        if not (math.isfinite(amount) and amount > 0):
+            return TransferStatus.INVALID_AMOUNT
+
+        fee = rate * amount
+        sender_slot = self.open_account(sender)
+        if self.balances[sender_slot] < amount + fee:
+            return TransferStatus.INSUFFICIENT_FUNDS
+
+        receiver_slot = self.open_account(receiver)
+        self.balances[sender_slot] -= amount + fee
+        self.balances[receiver_slot] += amount
+        self.charge_fee(transaction_type, fee)
+        return TransferStatus.PROCESSED
+
+    def charge_fee(self, transaction_type, fee):
+        """
+        Adds a collected fee to the total of its transaction type.
+        """
+        self.fees[transaction_type] += fee
+
+    def copy_state(self):
+        """
+        Returns copies of the account slots, the balances and the fee totals.
+        """
+        return dict(self.slots), array("d", self.balances), dict(self.fees)
+
+
+class ConcurrentAccountLedger(AccountLedger):
+    """
+    Account ledger whose account opening and fee totals are thread-safe.
+    Callers still have to lock the accounts taking part in a transfer.
+    """
+
+    def __init__(self, default_balance=0):
+        """
+        Initialize the empty ledger and its locks.
+        """
+        super().__init__(default_balance)
+        self._accounts_lock = threading.Lock()
+        self._fees_lock = threading.Lock()
+
+    def open_account(self, account_number, balance=None):
+        """
+        Opens an account, returning its slot in the balances array.
+        """
+        slot = self.slots.get(account_number)
+        if slot is not None:
+            return slot
+
+        with self._accounts_lock:
+            return super().open_account(account_number, balance)
+
+    def charge_fee(self, transaction_type, fee):
+        """
+        Adds a collected fee to the total of its transaction type.
+        """
+        with self._fees_lock:
+            super().charge_fee(transaction_type, fee)
+
+    def copy_state(self):
+        """
+        Returns copies of the account slots, the balances and the fee totals.
+        No account can be opened while they are copied, but callers still have
+        to lock the accounts to keep transfers out.
+        """
+        with self._accounts_lock, self._fees_lock:
+            return super().copy_state()
+
+
+def _encode_account(account_number):
+    """
+    Returns the UTF-8 account number, checking it fits the record size fields.
+    """
+    if not isinstance(account_number, str):
+        raise TypeError(f"Account number {account_number!r} is not a string.")
+    name = account_number.encode("utf-8")
+    if len(name) > _ACCOUNT_SIZE_LIMIT:
+        raise ValueError(f"Account number is longer than {_ACCOUNT_SIZE_LIMIT} bytes.")
+    return name
+
+
+def encode_transfer(sender, receiver, amount, transaction_type):
+    """
+    Returns the journal record of a transfer.
+    Building it before the money moves means a transfer that cannot be
+    journaled fails without changing any balance.
+    """
+    sender = _encode_account(sender)
+    receiver = _encode_account(receiver)
+    entry = (
+        _JOURNAL_ENTRY.pack(
+            amount,
+            TRANSACTION_TYPES.index(transaction_type),
+            len(sender),
+            len(receiver),
+        )
+        + sender
+        + receiver
+    )
+    return _JOURNAL_CHECKSUM.pack(zlib.crc32(entry)) + entry
+
+
+class TransactionJournal:  # pylint: disable=too-many-instance-attributes
+    """
+    Append-only journal of processed transfers with group commit.
+    Appended records are buffered until a caller waits for one of them to be
+    durable. That caller writes every pending record with a single fsync, so
+    threads waiting at the same time share it, and a batch can append many
+    records before waiting once. The buffer is also committed once
+    ``group_size`` records are pending.
+    """
+
+    def __init__(self, path, group_size=64):
+        """
+        Opens the journal for appending.
+        """
+        self.path = path
+        self.group_size = group_size
+        self._file = open(path, "ab")  # pylint: disable=consider-using-with
+        self._pending = []
+        self._appended = 0
+        self._committed = 0
+        # The pending buffer has its own lock, so records can be appended
+        # while a group is being written and synced.
+        self._lock = threading.Lock()
+        self._commit_lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def offset(self):
+        """
+        Size of the committed part of the journal.
+        """
+        with self._commit_lock:
+            return self._file.tell()
+
+    def append(self, sender, receiver, amount, transaction_type):
+        """
+        Buffers a transfer record, committing the group once it is full.
+        Returns the sequence number to wait for before reporting the transfer.
+        """
+        return self.append_record(
+            encode_transfer(sender, receiver, amount, transaction_type)
+        )
+
+    def append_record(self, record):
+        """
+        Buffers a record built by encode_transfer, see ``append``.
+        """
+        with self._lock:
+            self._pending.append(record)
+            self._appended += 1
+            sequence = self._appended
+            full = len(self._pending) >= self.group_size
+        if full:
+            self.wait(sequence)
+        return sequence
+
+    def wait(self, sequence):
+        """
+        Returns once the records up to a sequence number are written and
+        fsynced, committing the pending group if they are not yet.
+        """
+        with self._commit_lock:
+            if self._committed >= sequence:
+                return
+            with self._lock:
+                records, self._pending = self._pending, []
+                appended = self._appended
+            self._file.write(b"".join(records))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._committed = appended
+
+    def commit(self):
+        """
+        Writes and fsyncs the pending records.
+        """
+        with self._lock:
+            appended = self._appended
+        self.wait(appended)
+
+    def close(self):
+        """
+        Commits the pending records and closes the journal.
+        """
+        self.commit()
+        self._file.close()
+
+
+def iter_journal(path, offset=0):
+    """
+    Yields (sender, receiver, amount, transaction type, next offset) for every
+    valid record from an offset, stopping at a torn or corrupted record.
+    """
+    with open(path, "rb") as file:
+        file.seek(offset)
+        data = file.read()
+
+    position = 0
+    header_size = _JOURNAL_CHECKSUM.size + _JOURNAL_ENTRY.size
+    while position + header_size <= len(data):
+        (checksum,) = _JOURNAL_CHECKSUM.unpack_from(data, position)
+        entry_start = position + _JOURNAL_CHECKSUM.size
+        amount, type_index, sender_size, receiver_size = _JOURNAL_ENTRY.unpack_from(
+            data, entry_start
+        )
+        sender_start = position + header_size
+        receiver_start = sender_start + sender_size
+        end = receiver_start + receiver_size
+        if end > len(data) or zlib.crc32(data[entry_start:end]) != checksum:
+            return
+
+        yield (
+            data[sender_start:receiver_start].decode("utf-8"),
+            data[receiver_start:end].decode("utf-8"),
+            amount,
+            TRANSACTION_TYPES[type_index],
+            offset + end,
+        )
+        position = end
+
+
+def save_ledger_snapshot(path, ledger, journal_offset):
+    """
+    Atomically writes the balances and fee totals of a ledger, with the
+    journal offset they include. They are copied first, so accounts opened
+    meanwhile cannot change what is written.
+    """
+    slots, balances, fees = ledger.copy_state()
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(_SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, journal_offset, len(slots)))
+        file.write(struct.pack(f"<{len(TRANSACTION_TYPES)}d", *fees.values()))
+        for account_number, slot in slots.items():
+            name = _encode_account(account_number)
+            file.write(_SNAPSHOT_ACCOUNT.pack(balances[slot], len(name)))
+            file.write(name)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+
+def load_ledger_snapshot(path, ledger):
+    """
+    Loads a snapshot into an empty ledger, returning its journal offset.
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    magic, journal_offset, count = _SNAPSHOT_HEADER.unpack_from(data)
+    if magic != _SNAPSHOT_MAGIC:
+        raise ValueError(f"'{path}' is not a ledger snapshot")
+
+    position = _SNAPSHOT_HEADER.size
+    fees = struct.unpack_from(f"<{len(TRANSACTION_TYPES)}d", data, position)
+    ledger.fees.update(zip(TRANSACTION_TYPES, fees))
+    position += 8 * len(TRANSACTION_TYPES)
+    for _ in range(count):
+        balance, size = _SNAPSHOT_ACCOUNT.unpack_from(data, position)
+        position += _SNAPSHOT_ACCOUNT.size
+        ledger.open_account(data[position : position + size].decode("utf-8"), balance)
+        position += size
+    return journal_offset
+
+
+def recover_ledger(ledger, journal_path, snapshot_path=None):
+    """
+    Restores an empty ledger from the last snapshot and the journal tail.
+    A torn tail is cut off the journal so new records can be appended to it.
+    Returns the journal offset reached.
+    """
+    offset = 0
+    if snapshot_path and os.path.exists(snapshot_path):
+        offset = load_ledger_snapshot(snapshot_path, ledger)
+    if not os.path.exists(journal_path):
+        return offset
+
+    for *transfer, next_offset in iter_journal(journal_path, offset):
+        ledger.transfer(*transfer)
+        offset = next_offset
+    os.truncate(journal_path, offset)
+    return offset
@@ -4,14 +4,62 @@
 Source code for mock up testing examples.
 """
 import subprocess
+import threading
 import time
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
 
-def fetch_data_from_api(url):
-    """Fetches data from an external API using the requests library."""
-    response = requests.get(url, timeout=10)
+_shared_session = None  # pylint: disable=invalid-name
+_shared_session_lock = threading.Lock()
+
+
+def create_session(pool_size=10, retries=3, backoff_factor=0.3):
+    """
+    Creates a session whose connections are kept alive and reused.
+    Up to ``pool_size`` connections per host are pooled, and failed
+    connections or retryable status codes are retried with exponential backoff.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+    )
+    session = requests.Session()
+    session.headers["Connection"] = "keep-alive"
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_shared_session():
+    """
+    Returns the pooled session shared by every caller that does not bring its
+    own, creating it on first use.
+    """
+    global _shared_session  # pylint: disable=global-statement
+    if _shared_session is None:
+        with _shared_session_lock:
+            if _shared_session is None:
+                _shared_session = create_session()
+    return _shared_session
+
+
+def fetch_data_from_api(url, session=None):
+    """
+    Fetches data from an external API using the requests library.
+    Requests go through the shared pooled session, so connections are reused
+    across calls, unless another session is passed.
+    """
+    if session is None:
+        session = get_shared_session()
+    response = session.get(url, timeout=10)
     return response.json()
 
 
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+
+"""
+User sessions with expiry and salted password verification.
+"""
+import hashlib
+import heapq
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+
+PASSWORD_HASH_ITERATIONS = 100000
+
+
+class SessionStore:
+    """
+    Set of logged in users whose sessions expire after a time to live.
+    Membership checks are dict lookups. Expired sessions are purged lazily
+    from a heap ordered by expiry time.
+    """
+
+    def __init__(self, ttl=1800, clock=time.monotonic):
+        """
+        Initialize the empty store, ``ttl`` is in seconds of ``clock``.
+        """
+        self.ttl = ttl
+        self.clock = clock
+        self._expiries = {}
+        self._heap = []
+
+    def __contains__(self, username):
+        """
+        Checks the user has a session that has not expired.
+        """
+        expiry = self._expiries.get(username)
+        return expiry is not None and expiry > self.clock()
+
+    def __len__(self):
+        """
+        Number of live sessions.
+        """
+        self.purge()
+        return len(self._expiries)
+
+    def add(self, username):
+        """
+        Starts or renews the session of a user.
+        """
+        self.purge()
+        expiry = self.clock() + self.ttl
+        self._expiries[username] = expiry
+        heapq.heappush(self._heap, (expiry, username))
+
+    def discard(self, username):
+        """
+        Ends the session of a user, if any.
+        """
+        self._expiries.pop(username, None)
+
+    def purge(self):
+        """
+        Drops the expired sessions.
+        """
+        now = self.clock()
+        while self._heap and self._heap[0][0] <= now:
+            expiry, username = heapq.heappop(self._heap)
+            # Renewed or ended sessions leave stale heap entries behind.
+            if self._expiries.get(username) == expiry:
+                del self._expiries[username]
+
+
+def hash_password(password, salt=None, iterations=None):
+    """
+    Returns the salt and the PBKDF2-SHA256 digest of a password.
+    """
+    salt = os.urandom(16) if salt is None else salt
+    digest = hashlib.pbkdf2_hmac(
+        "sha256",
+        password.encode("utf-8"),
+        salt,
+        iterations or PASSWORD_HASH_ITERATIONS,
+    )
+    return salt, digest
+
+
+class PasswordVerifier:
+    """
+    Salted password hashes of the users, with a cache of recent verifications.
+    The cache keeps a keyed HMAC of each recently verified password, so
+    repeated logins skip the slow hash without storing the password itself.
+    A lock guards the records and the cache, but hashing runs outside it so
+    logins from many threads do not queue behind each other.
+    """
+
+    def __init__(self, cache_size=1024, iterations=None):
+        """
+        Initialize the empty verifier.
+        """
+        self.cache_size = cache_size
+        self.iterations = iterations
+        self.records = {}
+        self._cache = OrderedDict()
+        self._cache_key = os.urandom(32)
+        self._lock = threading.Lock()
+
+    def __contains__(self, username):
+        """
+        Checks the user has a password.
+        """
+        return username in self.records
+
+    def _token(self, password):
+        """
+        Cheap keyed digest identifying a password inside the cache.
+        """
+        return hmac.new(self._cache_key, password.encode("utf-8"), "sha256").digest()
+
+    def set_password(self, username, password):
+        """
+        Stores the salted hash of a user password.
+        """
+        record = hash_password(password, iterations=self.iterations)
+        with self._lock:
+            self.records[username] = record
+            self._cache.pop(username, None)
+
+    def verify(self, username, password):
+        """
+        Checks the password of a user.
+        """
+        with self._lock:
+            record = self.records.get(username)
+            cached = self._cache.get(username)
+        if record is None:
+            return False
+
+        token = self._token(password)
+        if cached is not None and hmac.compare_digest(cached, token):
+            with self._lock:
+                if username in self._cache:
+                    self._cache.move_to_end(username)
+            return True
+
+        salt, digest = record
+        _, candidate = hash_password(password, salt, self.iterations)
+        if not hmac.compare_digest(candidate, digest):
+            return False
+
+        with self._lock:
+            # A password changed while hashing must not be cached.
+            if self.records.get(username) is record:
+                self._cache[username] = token
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return True
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+
+"""
+Table-driven finite state machines.
+"""
+import os
+import struct
+from array import array
+
+_SNAPSHOT_HEADER = struct.Struct("<4sQQ")
+_SNAPSHOT_MAGIC = b"FSM1"
+
+
+class StateMachine:  # pylint: disable=too-many-instance-attributes
+    """
+    Finite state machine compiled into a transition table.
+    States and events are small integers, their names index into ``states``
+    and ``events``. Events without a transition leave the state unchanged and
+    return the invalid message.
+    """
+
+    def __init__(
+        self, states, events, transitions, initial, invalid_message=None
+    ):  # pylint: disable=too-many-arguments
+        """
+        Compiles the {(state, event): (next state, message)} transitions.
+        """
+        if len(states) > 256:
+            raise ValueError("State machines support at most 256 states")
+
+        self.states = tuple(states)
+        self.events = tuple(events)
+        self.state_ids = {state: index for index, state in enumerate(self.states)}
+        self.event_ids = {event: index for index, event in enumerate(self.events)}
+        self.initial = self.state_ids[initial]
+
+        width = len(self.events)
+        self.next_states = array(
+            "B", [state for state in range(len(self.states)) for _ in self.events]
+        )
+        self.messages = [invalid_message] * len(self.next_states)
+        for (state, event), (next_state, message) in transitions.items():
+            index = self.state_ids[state] * width + self.event_ids[event]
+            self.next_states[index] = self.state_ids[next_state]
+            self.messages[index] = message
+
+        # One 256 byte translation table per event, so a whole bytearray of
+        # states can be stepped with bytearray.translate.
+        self.translations = [
+            bytes(
+                (
+                    self.next_states[state * width + event]
+                    if state < len(states)
+                    else state
+                )
+                for state in range(256)
+            )
+            for event in range(width)
+        ]
+
+    def step(self, state, event):
+        """
+        Returns the next state and the message of an event.
+        """
+        index = state * len(self.events) + event
+        return self.next_states[index], self.messages[index]
+
+    def event_transitions(self, event):
+        """
+        Returns the (next state, message) of an event by name for every state,
+        indexed by state id.
+        """
+        width = len(self.events)
+        event_id = self.event_ids[event]
+        return tuple(
+            (self.next_states[index], self.messages[index])
+            for index in range(event_id, len(self.next_states), width)
+        )
+
+    def step_many(self, states, event):
+        """
+        Applies the same event to a bytearray of states, returning the new states.
+        """
+        return states.translate(self.translations[event])
+
+    def step_each(self, states, events):
+        """
+        Applies one event per machine, returning the new states as a bytearray.
+        """
+        if len(states) != len(events):
+            raise ValueError("States and events must have the same length")
+
+        width = len(self.events)
+        next_states = self.next_states
+        return bytearray(
+            next_states[state * width + event] for state, event in zip(states, events)
+        )
+
+
+class MachineFacade:
+    """
+    Base class of objects driving a single machine by event name.
+    Subclasses set ``machine`` to their StateMachine, and resolve the events
+    they fire on every call into class constants from
+    ``machine.event_transitions``, indexed by ``state_id``.
+    """
+
+    machine = None
+
+    def __init__(self):
+        """
+        Defines the initial state.
+        """
+        self.state_id = self.machine.initial
+
+    @property
+    def state(self):
+        """
+        Name of the current state.
+        """
+        return self.machine.states[self.state_id]
+
+    @state.setter
+    def state(self, state):
+        self.state_id = self.machine.state_ids[state]
+
+    def fire(self, event):
+        """
+        Applies an event by name and returns its message.
+        """
+        machine = self.machine
+        index = self.state_id * len(machine.events) + machine.event_ids[event]
+        self.state_id = machine.next_states[index]
+        return machine.messages[index]
+
+
+def save_fleet_snapshot(path, states, offset):
+    """
+    Atomically writes the states of a fleet with the event log offset they reflect.
+    """
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(_SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, offset, len(states)))
+        file.write(states)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+
+def load_fleet_snapshot(path):
+    """
+    Reads a fleet snapshot, returning the states and the event log offset.
+    """
+    with open(path, "rb") as file:
+        magic, offset, count = _SNAPSHOT_HEADER.unpack(file.read(_SNAPSHOT_HEADER.size))
+        if magic != _SNAPSHOT_MAGIC:
+            raise ValueError(f"'{path}' is not a fleet snapshot")
+        states = bytearray(file.read(count))
+    if len(states) != count:
+        raise ValueError(f"'{path}' is truncated")
+    return states, offset
+
+
+def replay_event_log(
+    machine, log_path, states, offset=0, snapshot_path=None, snapshot_interval=100000
+):  # pylint: disable=too-many-arguments
+    """
+    Applies the events of a log to a fleet of states in place.
+    Each log line holds a machine index and an event name separated by a space,
+    blank lines are skipped.
+    The log is read through a buffered binary reader, from a byte offset up to
+    the last complete line. Replay stops at a line naming no machine of the
+    fleet or no event of the machine, the same way as at a torn tail.
+    When a snapshot path is given, a snapshot is written at least every
+    ``snapshot_interval`` events and once replay ends.
+    Returns the offset just after the last applied event.
+    """
+    width = len(machine.events)
+    next_states = machine.next_states
+    event_ids = {
+        event.encode("utf-8"): index for index, event in enumerate(machine.events)
+    }
+    since_snapshot = 0
+
+    with open(log_path, "rb") as log:
+        log.seek(offset)
+        for line in log:
+            if not line.endswith(b"\n"):
+                break
+            fields = line.split(None, 1)
+            if not fields:
+                offset += len(line)
+                continue
+            if len(fields) != 2 or not fields[0].isdigit():
+                break
+            machine_id = int(fields[0])
+            event_id = event_ids.get(fields[1].strip())
+            if event_id is None or machine_id >= len(states):
+                break
+
+            states[machine_id] = next_states[states[machine_id] * width + event_id]
+            offset += len(line)
+            since_snapshot += 1
+            if snapshot_path and since_snapshot >= snapshot_interval:
+                save_fleet_snapshot(snapshot_path, states, offset)
+                since_snapshot = 0
+
+    if snapshot_path and since_snapshot:
+        save_fleet_snapshot(snapshot_path, states, offset)
+    return offset
+
+
+def recover_fleet(
+    machine, log_path, snapshot_path, fleet_size, snapshot_interval=100000
+):  # pylint: disable=too-many-arguments
+    """
+    Rebuilds the states of a fleet from its last snapshot and the log tail.
+    Without a snapshot every machine starts in the initial state and the whole
+    log is replayed. Returns the states and the offset replay reached.
+    """
+    if os.path.exists(snapshot_path):
+        states, offset = load_fleet_snapshot(snapshot_path)
+        states.extend([machine.initial] * (fleet_size - len(states)))
+    else:
+        states, offset = bytearray([machine.initial] * fleet_size), 0
+
+    offset = replay_event_log(
+        machine, log_path, states, offset, snapshot_path, snapshot_interval
+    )
+    return states, offset
@@ -3,7 +3,36 @@
 """
 White-box code examples.
 """
-import re
+# pylint: disable=too-many-lines
+import calendar
+import csv
+import enum
+import json
+import math
+import string
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from functools import reduce
+from itertools import islice
+from operator import add, gt, index, mul
+
+from src.brackets import BracketTable, above, below
+from src.ledger import (
+    TRANSACTION_FEES,
+    AccountLedger,
+    ConcurrentAccountLedger,
+    TransferStatus,
+    encode_transfer,
+    recover_ledger,
+    save_ledger_snapshot,
+)
+from src.sessions import PasswordVerifier, SessionStore
+from src.state_machine import MachineFacade, StateMachine
 
 
 def is_even(num):
@@ -23,19 +52,16 @@ def divide(a, b):
     return result
 
 
+GRADE_BRACKETS = BracketTable(
+    [(90, math.inf, "A"), (80, below(90), "B"), (70, below(80), "C")], "F"
+)
+
+
 def get_grade(score):
     """
     Grade function.
     """
-    if score >= 90:
-        grade = "A"
-    elif score >= 80:
-        grade = "B"
-    elif score >= 70:
-        grade = "C"
-    else:
-        grade = "F"
-    return grade
+    return GRADE_BRACKETS.lookup(score)
 
 
 def is_triangle(a, b, c):
@@ -63,6 +89,11 @@ def check_number_status(number):
 
 
 # 2
+PASSWORD_UPPERCASE = frozenset(string.ascii_uppercase)
+PASSWORD_LOWERCASE = frozenset(string.ascii_lowercase)
+PASSWORD_SPECIAL_CHARACTERS = frozenset("!@#$%&")
+
+
 def validate_password(password):
     """
     Validates user passwords.
@@ -72,39 +103,63 @@ def validate_password(password):
         return False
 
     # Check for at least one uppercase letter, one lowercase letter,
-    # one digit, and one special character.
+    # one digit, and one special character. The password is swept once to
+    # collect its distinct characters, and each class is checked on those.
+    characters = set(password)
     if (
-        not re.search(r"[A-Z]", password)
-        or not re.search(r"[a-z]", password)
-        or not re.search(r"\d", password)
-        or not re.search(r"[!@#$%&]", password)
+        characters.isdisjoint(PASSWORD_UPPERCASE)
+        or characters.isdisjoint(PASSWORD_LOWERCASE)
+        or not any(map(str.isdecimal, characters))
+        or characters.isdisjoint(PASSWORD_SPECIAL_CHARACTERS)
     ):
         return False
 
     return True
 
 
+def validate_passwords(passwords):
+    """
+    Lazily validates a stream of passwords, yielding one result per entry.
+    Line endings are stripped, so an open file can be passed directly.
+    """
+    for password in passwords:
+        yield validate_password(password.rstrip("\r\n"))
+
+
 # 3
+TOTAL_DISCOUNT_BRACKETS = BracketTable(
+    [(100, 500, 0.1), (above(500), math.inf, 0.2)], 0
+)
+
+
 def calculate_total_discount(total_amount):
     """
     Calculates the discount for a customer's purchase based on the total amount.
     """
-    if total_amount < 100:
+    rate = TOTAL_DISCOUNT_BRACKETS.lookup(total_amount)
+    if not rate:
         return 0
 
-    if 100 <= total_amount <= 500:
-        return 0.1 * total_amount
-
-    return 0.2 * total_amount
+    return rate * total_amount
 
 
 # 4
+# Quantity discount tiers of an order line: 1 to 5 items pay full price, 6 to
+# 10 items get the small discount rate and any other quantity the large one.
+FULL_PRICE_QUANTITIES = (1, 5)
+SMALL_DISCOUNT_QUANTITIES = (6, 10)
+SMALL_DISCOUNT_RATE = 0.95
+LARGE_DISCOUNT_RATE = 0.9
+
+
 def calculate_order_total(items):
     """
     Processes user orders in an e-commerce system.
     The function calculates the total price of the items in the order,
     applying different discounts based on the quantity of each item.
     """
+    full_low, full_high = FULL_PRICE_QUANTITIES
+    small_low, small_high = SMALL_DISCOUNT_QUANTITIES
     total_price = 0
 
     for item in items:
@@ -112,17 +167,46 @@ def calculate_order_total(items):
         price_per_item = item["price"]
 
         # Apply discounts based on quantity
-        if 1 <= quantity <= 5:
+        if full_low <= quantity <= full_high:
             total_price += quantity * price_per_item
-        elif 6 <= quantity <= 10:
-            total_price += 0.95 * quantity * price_per_item  # 5% discount
+        elif small_low <= quantity <= small_high:
+            total_price += SMALL_DISCOUNT_RATE * quantity * price_per_item
         else:
-            total_price += 0.9 * quantity * price_per_item  # 10% discount
+            total_price += LARGE_DISCOUNT_RATE * quantity * price_per_item
 
     return total_price
 
 
+def calculate_line_totals(quantities, prices):
+    """
+    Prices a batch of order lines given as quantity and price columns.
+    Each line gets the same quantity discount as in calculate_order_total.
+    """
+    if len(quantities) != len(prices):
+        raise ValueError("Quantities and prices must have the same length")
+
+    full_low, full_high = FULL_PRICE_QUANTITIES
+    small_low, small_high = SMALL_DISCOUNT_QUANTITIES
+    line_totals = []
+    append = line_totals.append
+    for quantity, price_per_item in zip(quantities, prices):
+        if full_low <= quantity <= full_high:
+            append(quantity * price_per_item)
+        elif small_low <= quantity <= small_high:
+            append(SMALL_DISCOUNT_RATE * quantity * price_per_item)
+        else:
+            append(LARGE_DISCOUNT_RATE * quantity * price_per_item)
+
+    return line_totals
+
+
 # 5
+# Upper weight limits of the shipping brackets and the rate of each bracket,
+# the last rate applies above the last limit.
+SHIPPING_WEIGHT_LIMITS = (5, 10)
+SHIPPING_RATES = {"standard": (10, 15, 20), "express": (20, 30, 40)}
+
+
 def calculate_items_shipping_cost(items, shipping_method):
     """
     Calculates shipping costs for an online shopping system.
@@ -130,26 +214,31 @@ def calculate_items_shipping_cost(items, shipping_method):
     items in the order and the shipping method chosen by the customer.
     """
     total_weight = sum(item["weight"] for item in items)
+    rates = SHIPPING_RATES.get(shipping_method)
+    if rates is None:
+        raise ValueError("Invalid shipping method")
 
-    if shipping_method == "standard":
-        if total_weight <= 5:
-            return 10
-
-        if 5 < total_weight <= 10:
-            return 15
-
-        return 20
+    return rates[bisect_left(SHIPPING_WEIGHT_LIMITS, total_weight)]
 
-    if shipping_method == "express":
-        if total_weight <= 5:
-            return 20
 
-        if 5 < total_weight <= 10:
-            return 30
+def calculate_orders_shipping_cost(total_weights, shipping_methods):
+    """
+    Calculates the shipping costs of a batch of orders from their total weights
+    and shipping methods, looking the rates up in SHIPPING_RATES.
+    Orders with an unknown shipping method get None instead of raising.
+    """
+    if len(total_weights) != len(shipping_methods):
+        raise ValueError("Weights and shipping methods must have the same length")
 
-        return 40
+    costs = []
+    for total_weight, shipping_method in zip(total_weights, shipping_methods):
+        rates = SHIPPING_RATES.get(shipping_method)
+        if rates is None:
+            costs.append(None)
+        else:
+            costs.append(rates[bisect_left(SHIPPING_WEIGHT_LIMITS, total_weight)])
 
-    raise ValueError("Invalid shipping method")
+    return costs
 
 
 # 6
@@ -175,20 +264,17 @@ def verify_age(age):
 
 
 # 8
+PRODUCT_CATEGORY_BRACKETS = BracketTable(
+    [(10, 50, "Category A"), (51, 100, "Category B"), (101, 200, "Category C")],
+    "Category D",
+)
+
+
 def categorize_product(price):
     """
     Determines the price category of a product based on its price.
     """
-    if 10 <= price <= 50:
-        return "Category A"
-
-    if 51 <= price <= 100:
-        return "Category B"
-
-    if 101 <= price <= 200:
-        return "Category C"
-
-    return "Category D"
+    return PRODUCT_CATEGORY_BRACKETS.lookup(price)
 
 
 # 9
@@ -214,27 +300,175 @@ def celsius_to_fahrenheit(celsius):
 
 
 # 11
-def validate_credit_card(card_number):
+# Issuer, inclusive ranges of leading digits and allowed card number lengths.
+CARD_ISSUERS = (
+    ("Visa", ((4, 4),), (13, 16)),
+    ("Mastercard", ((51, 55), (2221, 2720)), (16,)),
+    ("American Express", ((34, 34), (37, 37)), (15,)),
+    ("Discover", ((6011, 6011), (644, 649), (65, 65)), (16,)),
+    ("Diners Club", ((300, 305), (36, 36), (38, 38)), (14,)),
+    ("JCB", ((3528, 3589),), (16,)),
+)
+
+# Leading digits to (issuer, lengths), expanded once from CARD_ISSUERS.
+CARD_ISSUER_PREFIXES = {
+    str(prefix): (issuer, lengths)
+    for issuer, ranges, lengths in CARD_ISSUERS
+    for low, high in ranges
+    for prefix in range(low, high + 1)
+}
+CARD_PREFIX_SIZES = sorted(
+    {len(prefix) for prefix in CARD_ISSUER_PREFIXES}, reverse=True
+)
+
+# Luhn value of each digit once doubled.
+LUHN_DOUBLED_DIGITS = (0, 2, 4, 6, 8, 1, 3, 5, 7, 9)
+# Translation tables from ASCII digits to their Luhn values, as is and doubled.
+LUHN_DIGIT_VALUES = bytes.maketrans(b"0123456789", bytes(range(10)))
+LUHN_DOUBLED_VALUES = bytes.maketrans(b"0123456789", bytes(LUHN_DOUBLED_DIGITS))
+
+
+def _match_card_prefix(card_number):
+    """
+    Returns the (issuer, lengths) entry of the longest known prefix, or None.
+    """
+    for size in CARD_PREFIX_SIZES:
+        entry = CARD_ISSUER_PREFIXES.get(card_number[:size])
+        if entry is not None:
+            return entry
+
+    return None
+
+
+# Issuer entry, or None, of every four leading digits, so numbers of at least
+# four digits find their issuer with a single lookup.
+CARD_ISSUER_LEADING_DIGITS = {
+    leading_digits: _match_card_prefix(leading_digits)
+    for leading_digits in (f"{number:04d}" for number in range(10000))
+}
+
+
+def _find_card_issuer(card_number):
+    """
+    Returns the (issuer, lengths) entry of the longest known prefix, or None.
+    """
+    if len(card_number) >= 4:
+        return CARD_ISSUER_LEADING_DIGITS.get(card_number[:4])
+
+    return _match_card_prefix(card_number)
+
+
+def get_card_issuer(card_number):
+    """
+    Returns the issuer of a card number, or None when the prefix is unknown.
+    """
+    entry = _find_card_issuer(card_number)
+    return entry[0] if entry else None
+
+
+def passes_luhn_check(card_number):
+    """
+    Checks the Luhn checksum of a string of ASCII digits.
+    The digits are mapped to their Luhn values with bytes.translate, so the
+    sums run over bytes without a Python step per digit.
+    """
+    digits = card_number.encode("ascii")[::-1]
+    total = sum(digits[::2].translate(LUHN_DIGIT_VALUES))
+    total += sum(digits[1::2].translate(LUHN_DOUBLED_VALUES))
+    return total % 10 == 0
+
+
+def is_genuine_card(card_number):
+    """
+    Checks the issuer prefix, length and Luhn checksum of a card number.
+    """
+    if not (card_number.isascii() and card_number.isdigit()):
+        return False
+
+    entry = _find_card_issuer(card_number)
+    return (
+        entry is not None
+        and len(card_number) in entry[1]
+        and passes_luhn_check(card_number)
+    )
+
+
+def validate_credit_card(card_number, strict=False):
     """
     Validates credit card numbers.
+    In strict mode the number must also belong to a known issuer, have one of
+    its lengths and pass the Luhn checksum.
     """
     if 13 <= len(card_number) <= 16 and card_number.isdigit():
-        return "Valid Card"
+        if not strict or is_genuine_card(card_number):
+            return "Valid Card"
 
     return "Invalid Card"
 
 
+def validate_credit_cards(card_numbers, strict=False):
+    """
+    Validates a batch of card numbers, returning one boolean per number.
+    The checks are the ones of validate_credit_card, inlined in a single
+    pass over the numbers with one issuer lookup per number.
+    """
+    if not strict:
+        return [
+            13 <= len(card_number) <= 16 and card_number.isdigit()
+            for card_number in card_numbers
+        ]
+
+    # Every issuer length is within 13 to 16, so genuine cards always pass
+    # the basic length check.
+    find_issuer = _find_card_issuer
+    return [
+        card_number.isascii()
+        and card_number.isdigit()
+        and (entry := find_issuer(card_number)) is not None
+        and len(card_number) in entry[1]
+        and passes_luhn_check(card_number)
+        for card_number in card_numbers
+    ]
+
+
 # 12
-def validate_date(year, month, day):
+# Length of every month of the supported years, leap years included,
+# indexed by (year - 1900) * 12 + month - 1.
+DAYS_IN_MONTH = tuple(
+    calendar.monthrange(year, month)[1]
+    for year in range(1900, 2101)
+    for month in range(1, 13)
+)
+
+
+def validate_date(year, month, day, strict=False):
     """
     Validates dates.
+    In strict mode the day must also exist in the month, so Feb 30 is invalid.
     """
     if 1900 <= year <= 2100 and 1 <= month <= 12 and 1 <= day <= 31:
-        return "Valid Date"
+        if not strict or day <= DAYS_IN_MONTH[int((year - 1900) * 12 + month - 1)]:
+            return "Valid Date"
 
     return "Invalid Date"
 
 
+def validate_dates(years, months, days):
+    """
+    Strictly validates a batch of dates given as year, month and day columns,
+    returning one boolean per date.
+    """
+    if not len(years) == len(months) == len(days):
+        raise ValueError("Date columns must have the same length")
+
+    return [
+        1900 <= year <= 2100
+        and 1 <= month <= 12
+        and 1 <= day <= DAYS_IN_MONTH[int((year - 1900) * 12 + month - 1)]
+        for year, month, day in zip(years, months, days)
+    ]
+
+
 # 13
 def check_flight_eligibility(age, frequent_flyer):
     """
@@ -257,18 +491,119 @@ def validate_url(url):
     return "Invalid URL"
 
 
+class ValidationFlag(enum.IntFlag):
+    """
+    Bits set in a record result code, one for each failed validation.
+    """
+
+    VALID = 0
+    EMAIL = 1
+    URL = 2
+    CREDIT_CARD = 4
+    DATE = 8
+    LOGIN = 16
+
+
+def _validate_date_fields(year, month, day):
+    """
+    Validates a date whose fields may be numeric text read from a CSV file.
+    """
+    return validate_date(int(year), int(month), int(day))
+
+
+# Validator of each check and the label it returns for valid input.
+RECORD_CHECKS = {
+    ValidationFlag.EMAIL: (validate_email, "Valid Email"),
+    ValidationFlag.URL: (validate_url, "Valid URL"),
+    ValidationFlag.CREDIT_CARD: (validate_credit_card, "Valid Card"),
+    ValidationFlag.DATE: (_validate_date_fields, "Valid Date"),
+    ValidationFlag.LOGIN: (validate_login, "Login Successful"),
+}
+
+# Record fields passed to each check, in argument order.
+DEFAULT_RECORD_FIELDS = {
+    ValidationFlag.EMAIL: ("email",),
+    ValidationFlag.URL: ("url",),
+    ValidationFlag.CREDIT_CARD: ("card_number",),
+    ValidationFlag.DATE: ("year", "month", "day"),
+    ValidationFlag.LOGIN: ("username", "password"),
+}
+
+
+def validate_record(record, fields=None):
+    """
+    Validates the fields of a record, returning the flags of the failed checks.
+    ``fields`` maps each check to the record fields it reads and defaults to
+    DEFAULT_RECORD_FIELDS. Missing or malformed fields fail their check.
+    """
+    result = ValidationFlag.VALID
+    for flag, names in (fields or DEFAULT_RECORD_FIELDS).items():
+        validator, valid_label = RECORD_CHECKS[flag]
+        try:
+            valid = validator(*(record[name] for name in names)) == valid_label
+        except (AttributeError, KeyError, TypeError, ValueError):
+            valid = False
+        if not valid:
+            result |= flag
+
+    return result
+
+
+def _validate_batch(records, fields):
+    """
+    Validates a batch of records, run inside the worker processes.
+    """
+    return [validate_record(record, fields) for record in records]
+
+
+def read_records(file, fmt="jsonl"):
+    """
+    Streams records from a CSV file with a header row or a JSON lines file.
+    """
+    if fmt == "csv":
+        yield from csv.DictReader(file)
+    elif fmt == "jsonl":
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        raise ValueError(f"Unsupported record format '{fmt}'")
+
+
+def validate_records(records, fields=None, workers=None, batch_size=1000):
+    """
+    Lazily validates a stream of records, yielding one result code per record.
+    With ``workers`` set, batches are validated in a pool of processes while
+    keeping at most two batches per worker in flight.
+    """
+    records = iter(records)
+    batches = iter(lambda: list(islice(records, batch_size)), [])
+    if not workers:
+        for batch in batches:
+            yield from _validate_batch(batch, fields)
+        return
+
+    with ProcessPoolExecutor(workers) as executor:
+        pending = deque()
+        for batch in batches:
+            pending.append(executor.submit(_validate_batch, batch, fields))
+            if len(pending) > 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
 # 15
+QUANTITY_DISCOUNT_BRACKETS = BracketTable(
+    [(1, 5, "No Discount"), (6, 10, "5% Discount")], "10% Discount"
+)
+
+
 def calculate_quantity_discount(quantity):
     """
     Calculates discounts based on the quantity of a product.
     """
-    if 1 <= quantity <= 5:
-        return "No Discount"
-
-    if 6 <= quantity <= 10:
-        return "5% Discount"
-
-    return "10% Discount"
+    return QUANTITY_DISCOUNT_BRACKETS.lookup(quantity)
 
 
 # 16
@@ -283,32 +618,42 @@ def check_file_size(size_in_bytes):
 
 
 # 17
+# Income brackets, each one holding the credit score brackets of its loans.
+LOAN_BRACKETS = BracketTable(
+    [
+        (
+            30000,
+            60000,
+            BracketTable([(above(700), math.inf, "Standard Loan")], "Secured Loan"),
+        ),
+        (
+            above(60000),
+            math.inf,
+            BracketTable([(above(750), math.inf, "Premium Loan")], "Standard Loan"),
+        ),
+    ],
+    "Not Eligible",
+)
+
+
 def check_loan_eligibility(income, credit_score):
     """
     Checks if and which loan can be granted based on the income and credit score.
     """
-    if income < 30000:
-        return "Not Eligible"
-
-    if 30000 <= income <= 60000:
-        if credit_score > 700:
-            return "Standard Loan"
+    return LOAN_BRACKETS.classify(income, credit_score)
 
-        return "Secured Loan"
 
-    if credit_score > 750:
-        return "Premium Loan"
-
-    return "Standard Loan"
+# 18
+# Rates of small, medium and other packages.
+PACKAGE_RATES = (5, 10, 20)
 
 
-# 18
 def calculate_shipping_cost(weight, length, width, height):
     """
     Calculates the shipping cost based on the package weight and dimensions.
     """
     if weight <= 1 and length <= 10 and width <= 10 and height <= 10:
-        return 5
+        return PACKAGE_RATES[0]
 
     if (
         1 < weight <= 5
@@ -316,23 +661,66 @@ def calculate_shipping_cost(weight, length, width, height):
         and 11 <= width <= 30
         and 11 <= height <= 30
     ):
-        return 10
-
-    return 20
+        return PACKAGE_RATES[1]
+
+    return PACKAGE_RATES[2]
+
+
+def calculate_packages_shipping_cost(weights, lengths, widths, heights):
+    """
+    Calculates the shipping costs of a batch of packages given as weight and
+    dimension columns. Small packages weigh up to 1 and measure up to 10 on
+    every side, medium ones weigh over 1 and up to 5 and measure 11 to 30.
+    The rules are applied inline over the zipped columns, without a function
+    call per package, and the rates come from PACKAGE_RATES.
+    """
+    if not len(weights) == len(lengths) == len(widths) == len(heights):
+        raise ValueError("Package columns must have the same length")
+
+    small, medium, other = PACKAGE_RATES
+    return [
+        (
+            small
+            if weight <= 1 and length <= 10 and width <= 10 and height <= 10
+            else (
+                medium
+                if 1 < weight <= 5
+                and 11 <= length <= 30
+                and 11 <= width <= 30
+                and 11 <= height <= 30
+                else other
+            )
+        )
+        for weight, length, width, height in zip(weights, lengths, widths, heights)
+    ]
 
 
 # 19
+# Correct answer brackets, each one holding its incorrect answer brackets.
+QUIZ_BRACKETS = BracketTable(
+    [
+        (
+            5,
+            below(7),
+            BracketTable([(-math.inf, 3, "Conditional Pass")], "Fail"),
+        ),
+        (
+            7,
+            math.inf,
+            BracketTable(
+                [(-math.inf, 2, "Pass"), (above(2), 3, "Conditional Pass")], "Fail"
+            ),
+        ),
+    ],
+    "Fail",
+)
+
+
 def grade_quiz(correct_answers, incorrect_answers):
     """
     Grades online quizzes based on the number of correct and incorrect answers.
     """
-    if correct_answers >= 7 and incorrect_answers <= 2:
-        return "Pass"
-
-    if correct_answers >= 5 and incorrect_answers <= 3:
-        return "Conditional Pass"
-
-    return "Fail"
+    return QUIZ_BRACKETS.classify(correct_answers, incorrect_answers)
 
 
 # 20
@@ -364,61 +752,69 @@ def get_weather_advisory(temperature, humidity):
 
 
 # 22
-class VendingMachine:
+VENDING_MACHINE_FSM = StateMachine(
+    states=("Ready", "Dispensing"),
+    events=("insert_coin", "select_drink"),
+    transitions={
+        ("Ready", "insert_coin"): ("Dispensing", "Coin Inserted. Select your drink."),
+        ("Dispensing", "select_drink"): ("Ready", "Drink Dispensed. Thank you!"),
+    },
+    initial="Ready",
+    invalid_message="Invalid operation in current state.",
+)
+
+
+class VendingMachine(MachineFacade):
     """
     A simple vending machine that dispenses drinks.
     It has two states: "Ready" and "Dispensing."
     """
 
-    def __init__(self):
-        """
-        Defines the vending machine initial state.
-        """
-        self.state = "Ready"
+    machine = VENDING_MACHINE_FSM
+    INSERT_COIN = VENDING_MACHINE_FSM.event_transitions("insert_coin")
+    SELECT_DRINK = VENDING_MACHINE_FSM.event_transitions("select_drink")
 
     def insert_coin(self):
         """
         Function called when a coin is inserted.
         """
-        if self.state == "Ready":
-            self.state = "Dispensing"
-            return "Coin Inserted. Select your drink."
-
-        return "Invalid operation in current state."
+        self.state_id, message = self.INSERT_COIN[self.state_id]
+        return message
 
     def select_drink(self):
         """
         Function called after selecting a drink.
         """
-        if self.state == "Dispensing":
-            self.state = "Ready"
-            return "Drink Dispensed. Thank you!"
-
-        return "Invalid operation in current state."
+        self.state_id, message = self.SELECT_DRINK[self.state_id]
+        return message
 
 
 # 23
-class TrafficLight:
+TRAFFIC_LIGHT_FSM = StateMachine(
+    states=("Red", "Green", "Yellow"),
+    events=("change_state",),
+    transitions={
+        ("Red", "change_state"): ("Green", None),
+        ("Green", "change_state"): ("Yellow", None),
+        ("Yellow", "change_state"): ("Red", None),
+    },
+    initial="Red",
+)
+
+
+class TrafficLight(MachineFacade):
     """
     A traffic light system with three states: "Green," "Yellow," and "Red."
     """
 
-    def __init__(self):
-        """
-        Defines the traffic light initial state.
-        """
-        self.state = "Red"
+    machine = TRAFFIC_LIGHT_FSM
+    CHANGE_STATE = TRAFFIC_LIGHT_FSM.event_transitions("change_state")
 
     def change_state(self):
         """
         Function that changes the traffic light state.
         """
-        if self.state == "Red":
-            self.state = "Green"
-        elif self.state == "Green":
-            self.state = "Yellow"
-        elif self.state == "Yellow":
-            self.state = "Red"
+        self.state_id = self.CHANGE_STATE[self.state_id][0]
 
     def get_current_state(self):
         """
@@ -428,112 +824,124 @@ class TrafficLight:
 
 
 # 24
-class UserAuthentication:
+USER_AUTHENTICATION_FSM = StateMachine(
+    states=("Logged Out", "Logged In"),
+    events=("login", "logout"),
+    transitions={
+        ("Logged Out", "login"): ("Logged In", "Login successful"),
+        ("Logged In", "logout"): ("Logged Out", "Logout successful"),
+    },
+    initial="Logged Out",
+    invalid_message="Invalid operation in current state",
+)
+
+
+class UserAuthentication(MachineFacade):
     """
     A user authentication system with states "Logged Out" and "Logged In."
     """
 
-    def __init__(self):
-        """
-        Defines the user initial state.
-        """
-        self.state = "Logged Out"
+    machine = USER_AUTHENTICATION_FSM
+    LOGIN = USER_AUTHENTICATION_FSM.event_transitions("login")
+    LOGOUT = USER_AUTHENTICATION_FSM.event_transitions("logout")
 
     def login(self):
         """
         Function to login a user.
         """
-        if self.state == "Logged Out":
-            self.state = "Logged In"
-            return "Login successful"
-
-        return "Invalid operation in current state"
+        self.state_id, message = self.LOGIN[self.state_id]
+        return message
 
     def logout(self):
         """
         Function to logout a user.
         """
-        if self.state == "Logged In":
-            self.state = "Logged Out"
-            return "Logout successful"
-
-        return "Invalid operation in current state"
+        self.state_id, message = self.LOGOUT[self.state_id]
+        return message
 
 
 # 25
-class DocumentEditingSystem:
+DOCUMENT_EDITING_FSM = StateMachine(
+    states=("Editing", "Saved"),
+    events=("save_document", "edit_document"),
+    transitions={
+        ("Editing", "save_document"): ("Saved", "Document saved successfully"),
+        ("Saved", "edit_document"): ("Editing", "Editing resumed"),
+    },
+    initial="Editing",
+    invalid_message="Invalid operation in current state",
+)
+
+
+class DocumentEditingSystem(MachineFacade):
     """
     A document editing system with states "Editing" and "Saved."
     """
 
-    def __init__(self):
-        """
-        Defines the initial state.
-        """
-        self.state = "Editing"
+    machine = DOCUMENT_EDITING_FSM
+    SAVE_DOCUMENT = DOCUMENT_EDITING_FSM.event_transitions("save_document")
+    EDIT_DOCUMENT = DOCUMENT_EDITING_FSM.event_transitions("edit_document")
 
     def save_document(self):
         """
         Function to save a document.
         """
-        if self.state == "Editing":
-            self.state = "Saved"
-            return "Document saved successfully"
-
-        return "Invalid operation in current state"
+        self.state_id, message = self.SAVE_DOCUMENT[self.state_id]
+        return message
 
     def edit_document(self):
         """
         Function to edit a document.
         """
-        if self.state == "Saved":
-            self.state = "Editing"
-            return "Editing resumed"
-
-        return "Invalid operation in current state"
+        self.state_id, message = self.EDIT_DOCUMENT[self.state_id]
+        return message
 
 
 # 26
-class ElevatorSystem:
+ELEVATOR_FSM = StateMachine(
+    states=("Idle", "Moving Up", "Moving Down"),
+    events=("move_up", "move_down", "stop"),
+    transitions={
+        ("Idle", "move_up"): ("Moving Up", "Elevator moving up"),
+        ("Idle", "move_down"): ("Moving Down", "Elevator moving down"),
+        ("Moving Up", "stop"): ("Idle", "Elevator stopped"),
+        ("Moving Down", "stop"): ("Idle", "Elevator stopped"),
+    },
+    initial="Idle",
+    invalid_message="Invalid operation in current state",
+)
+
+
+class ElevatorSystem(MachineFacade):
     """
     An elevator system with states "Idle," "Moving Up," and "Moving Down."
     """
 
-    def __init__(self):
-        """
-        Defines the elevator initial state.
-        """
-        self.state = "Idle"
+    machine = ELEVATOR_FSM
+    MOVE_UP = ELEVATOR_FSM.event_transitions("move_up")
+    MOVE_DOWN = ELEVATOR_FSM.event_transitions("move_down")
+    STOP = ELEVATOR_FSM.event_transitions("stop")
 
     def move_up(self):
         """
         Function to move up the elevator.
         """
-        if self.state == "Idle":
-            self.state = "Moving Up"
-            return "Elevator moving up"
-
-        return "Invalid operation in current state"
+        self.state_id, message = self.MOVE_UP[self.state_id]
+        return message
 
     def move_down(self):
         """
         Function to move down the elevator.
         """
-        if self.state == "Idle":
-            self.state = "Moving Down"
-            return "Elevator moving down"
-
-        return "Invalid operation in current state"
+        self.state_id, message = self.MOVE_DOWN[self.state_id]
+        return message
 
     def stop(self):
         """
         Function to stop the elevator.
         """
-        if self.state in ["Moving Up", "Moving Down"]:
-            self.state = "Idle"
-            return "Elevator stopped"
-
-        return "Invalid operation in current state"
+        self.state_id, message = self.STOP[self.state_id]
+        return message
 
 
 # 27
@@ -561,51 +969,52 @@ class BankingSystem:
     Banking system class.
     """
 
-    def __init__(self):
+    def __init__(self, default_balance=1000, journal=None, session_ttl=1800):
         """
         Mock users.
+        Accounts are opened on first use with the default balance. When a
+        TransactionJournal is given every processed transfer is recorded in it,
+        and reported only once its record is durable.
+        Sessions expire ``session_ttl`` seconds after login.
         """
-        self.users = {"user123": "pass123"}  # Simplified user database
-        self.logged_in_users = set()
+        self.users = PasswordVerifier()  # Simplified user database
+        self.users.set_password("user123", "pass123")
+        self.logged_in_users = SessionStore(session_ttl)
+        self.ledger = AccountLedger(default_balance)
+        self.journal = journal
 
     def authenticate(self, username, password):
         """
         User authentication function.
         """
-        if username in self.users and self.users[username] == password:
-            if username not in self.logged_in_users:
-                self.logged_in_users.add(username)
-                print(f"User {username} authenticated successfully.")
-                return True
+        if not self.users.verify(username, password):
+            print("Authentication failed.")
+            return False
 
+        if not self._start_session(username):
             print("User already logged in.")
-        else:
-            print("Authentication failed.")
+            return False
 
-        return False
+        print(f"User {username} authenticated successfully.")
+        return True
 
-    def transfer_money(self, sender, receiver, amount, transaction_type):
+    def _start_session(self, username):
         """
-        Function to perform a money transfer.
+        Opens a session unless the user already has one, returns whether it did.
         """
-        if sender not in self.logged_in_users:
-            print("Sender not authenticated.")
+        if username in self.logged_in_users:
             return False
 
-        # Simulate transaction processing logic
-        if transaction_type == "regular":
-            fee = 0.02 * amount
-        elif transaction_type == "express":
-            fee = 0.05 * amount
-        elif transaction_type == "scheduled":
-            fee = 0.01 * amount
-        else:
-            print("Invalid transaction type.")
-            return False
+        self.logged_in_users.add(username)
+        return True
 
-        # Simulate checking for sufficient funds
-        if BankAccount(sender, 1000).balance < (amount + fee):
-            print("Insufficient funds.")
+    def transfer_money(self, sender, receiver, amount, transaction_type):
+        """
+        Function to perform a money transfer.
+        """
+        status = self.apply_transfer(sender, receiver, amount, transaction_type)
+        if status is not TransferStatus.PROCESSED:
+            print(status.value)
             return False
 
         print(
@@ -614,6 +1023,151 @@ class BankingSystem:
         )
         return True
 
+    def apply_transfer(self, sender, receiver, amount, transaction_type):
+        """
+        Function to perform a money transfer without printing.
+        Returns the TransferStatus of the transfer. With a journal, a processed
+        transfer is only reported once its record is durable.
+        Account numbers are kept as strings, the way the journal replays them.
+        """
+        status, sequence = self._apply_transfer(
+            str(sender), str(receiver), amount, transaction_type
+        )
+        self._wait_durable(sequence)
+        return status
+
+    def _apply_transfer(self, sender, receiver, amount, transaction_type):
+        """
+        Checks the session of the sender and moves the money, returning the
+        status and the journal sequence number of the transfer.
+        """
+        if sender not in self.logged_in_users:
+            return TransferStatus.NOT_AUTHENTICATED, None
+
+        return self._transfer(sender, receiver, amount, transaction_type)
+
+    def _transfer(self, sender, receiver, amount, transaction_type):
+        """
+        Moves the money in the ledger and journals the processed transfers.
+        The sequence number is None unless a journal record was appended.
+        """
+        record = None
+        if self.journal is not None and transaction_type in TRANSACTION_FEES:
+            # Built first, so a transfer that cannot be journaled raises before
+            # any money moves.
+            record = encode_transfer(sender, receiver, amount, transaction_type)
+        status = self.ledger.transfer(sender, receiver, amount, transaction_type)
+        if status is TransferStatus.PROCESSED and record is not None:
+            return status, self.journal.append_record(record)
+        return status, None
+
+    def _wait_durable(self, sequence):
+        """
+        Waits for the journal records up to a sequence number to be durable.
+        """
+        if sequence is not None:
+            self.journal.wait(sequence)
+
+    def checkpoint(self, snapshot_path):
+        """
+        Function to commit the journal and snapshot the balances it reflects.
+        Calling it periodically keeps the journal tail to replay short.
+        """
+        self.journal.commit()
+        save_ledger_snapshot(snapshot_path, self.ledger, self.journal.offset)
+
+    def restore(self, journal_path, snapshot_path=None):
+        """
+        Function to rebuild the balances of a fresh system after a crash, from
+        the last snapshot and the journal tail.
+        """
+        return recover_ledger(self.ledger, journal_path, snapshot_path)
+
+    def settle(self, transfers):
+        """
+        Function to apply a batch of (sender, receiver, amount, transaction type)
+        transfers in order, returning the TransferStatus of each one.
+        The journal is synced once, before the batch is reported.
+        """
+        statuses = []
+        last_sequence = None
+        for sender, receiver, amount, transaction_type in transfers:
+            status, sequence = self._apply_transfer(
+                str(sender), str(receiver), amount, transaction_type
+            )
+            statuses.append(status)
+            if sequence is not None:
+                last_sequence = sequence
+        self._wait_durable(last_sequence)
+        return statuses
+
+    def get_account(self, account_number):
+        """
+        Function to get an account with its current ledger balance.
+        """
+        return BankAccount(account_number, self.ledger.balance(str(account_number)))
+
+
+class ConcurrentBankingSystem(BankingSystem):
+    """
+    Banking system safe to share between threads.
+    Account balances are guarded by a fixed pool of striped locks. A transfer
+    takes the stripes of both accounts in index order, so two transfers
+    between the same accounts in opposite directions cannot deadlock.
+    """
+
+    def __init__(
+        self, default_balance=1000, journal=None, session_ttl=1800, stripes=64
+    ):
+        """
+        Mock users and create the locks.
+        """
+        super().__init__(default_balance, journal, session_ttl)
+        self.ledger = ConcurrentAccountLedger(default_balance)
+        self._sessions_lock = threading.Lock()
+        self._stripes = [threading.Lock() for _ in range(stripes)]
+
+    def _stripe(self, account_number):
+        """
+        Index of the lock guarding an account.
+        """
+        return hash(account_number) % len(self._stripes)
+
+    def _start_session(self, username):
+        """
+        Opens a session unless the user already has one, returns whether it did.
+        Passwords are verified before, outside the sessions lock, so slow
+        logins never hold up transfers.
+        """
+        with self._sessions_lock:
+            return super()._start_session(username)
+
+    def _apply_transfer(self, sender, receiver, amount, transaction_type):
+        """
+        Checks the session of the sender and moves the money, returning the
+        status and the journal sequence number of the transfer.
+        The stripes are released before the caller waits for the journal, so
+        transfers of other threads join the same group commit.
+        """
+        with self._sessions_lock:
+            if sender not in self.logged_in_users:
+                return TransferStatus.NOT_AUTHENTICATED, None
+
+        with ExitStack() as stack:
+            for stripe in sorted({self._stripe(sender), self._stripe(receiver)}):
+                stack.enter_context(self._stripes[stripe])
+            return self._transfer(sender, receiver, amount, transaction_type)
+
+    def checkpoint(self, snapshot_path):
+        """
+        Function to commit the journal and snapshot the balances it reflects.
+        Every stripe is held so the snapshot sees no transfer half applied.
+        """
+        with ExitStack() as stack:
+            for stripe in self._stripes:
+                stack.enter_context(stripe)
+            super().checkpoint(snapshot_path)
+
 
 # 28
 class Product:  # pylint: disable=too-few-public-methods
@@ -621,12 +1175,15 @@ class Product:  # pylint: disable=too-few-public-methods
     Product class.
     """
 
-    def __init__(self, name, price):
+    __slots__ = ("name", "price", "product_id")
+
+    def __init__(self, name, price, product_id=None):
         """
         Set the product details.
         """
-        self.name = name
+        self.name = sys.intern(name)
         self.price = price
+        self.product_id = product_id
 
     def view_product(self):
         """
@@ -637,45 +1194,115 @@ class Product:  # pylint: disable=too-few-public-methods
         return msg
 
 
+def _sum_lines(line_totals):
+    """
+    Adds up line totals from left to right, the order in which cached cart
+    totals are extended, so a recomputed total matches a cached one.
+    """
+    return reduce(add, line_totals, 0)
+
+
 class ShoppingCart:
     """
     Shopping cart class.
+    The total is cached, so checking out does not sum every line again.
+    Price changes made through the registry given to the cart mark it stale,
+    without a registry prices are taken as fixed once added.
     """
 
-    def __init__(self):
+    def __init__(self, registry=None):
         """
         Initialize the shopping cart.
         """
-        self.items = []
+        # Cart lines keyed by product, dicts keep the insertion order.
+        self.lines = {}
+        self.registry = registry
+        self._total = 0
+        self._price_version = self._current_price_version()
+
+    def __len__(self):
+        """
+        Number of distinct products in the cart.
+        """
+        return len(self.lines)
+
+    def _current_price_version(self):
+        """
+        Price version of the registry, 0 without one.
+        """
+        return 0 if self.registry is None else self.registry.price_version
+
+    @property
+    def items(self):
+        """
+        Cart lines as {"product", "quantity"} dicts, in insertion order.
+        """
+        return list(self.lines.values())
+
+    @property
+    def total(self):
+        """
+        Cart total, recomputed from the lines in insertion order after a
+        removal, a merged line or a price change made it stale.
+        """
+        price_version = self._current_price_version()
+        if self._total is None or self._price_version != price_version:
+            self._price_version = price_version
+            self._total = _sum_lines(
+                line["product"].price * line["quantity"] for line in self.lines.values()
+            )
+        return self._total
 
     def add_product(self, product, quantity=1):
         """
         Function to add a product to the shopping cart.
         """
-        for item in self.items:
-            if item["product"] == product:
-                item["quantity"] += quantity
-                break
-        else:
-            self.items.append({"product": product, "quantity": quantity})
+        line = self.lines.get(product)
+        if line is not None:
+            line["quantity"] += quantity
+            self._total = None
+            return
+
+        line_total = product.price * quantity
+        self.lines[product] = {"product": product, "quantity": quantity}
+        if self._total is not None:
+            # A new last line extends the sum exactly as recomputing it would.
+            self._total += line_total
 
     def remove_product(self, product, quantity=1):
         """
         Function to remove a product from the shopping cart.
         """
-        for item in self.items:
-            if item["product"] == product:
-                if item["quantity"] <= quantity:
-                    self.items.remove(item)
-                else:
-                    item["quantity"] -= quantity
-                break
+        line = self.lines.get(product)
+        if line is None:
+            return
+
+        if line["quantity"] <= quantity:
+            del self.lines[product]
+        else:
+            line["quantity"] -= quantity
+        # Subtracting a line total would leave rounding errors behind.
+        self._total = None if self.lines else 0
+
+    def add_many(self, products):
+        """
+        Function to add many (product, quantity) pairs to the shopping cart.
+        """
+        for product, quantity in products:
+            self.add_product(product, quantity)
+
+    def remove_many(self, products):
+        """
+        Function to remove many (product, quantity) pairs from the shopping cart.
+        """
+        for product, quantity in products:
+            self.remove_product(product, quantity)
 
     def view_cart(self):
         """
         Function to display the shopping cart content.
         """
-        for item in self.items:
+        for item in self.lines.values():
             print(
                 f"{item['quantity']} x {item['product'].name}"
                 f" - ${item['product'].price * item['quantity']}"
@@ -685,6 +1312,169 @@ class ShoppingCart:
         """
         Function to checkout the items from the shopping cart.
         """
-        total = sum(item["product"].price * item["quantity"] for item in self.items)
-        print(f"Total: ${total}")
+        print(f"Total: ${self.total}")
         print("Checkout completed. Thank you for shopping!")
+
+
+class ProductRegistry:
+    """
+    Catalogue handing out one shared Product per name, with an integer id.
+    Prices are also kept in a compact column indexed by id. A price change
+    updates the shared Product and the column, and bumps ``price_version``,
+    which tells the carts using the registry their cached totals are stale.
+    """
+
+    def __init__(self):
+        """
+        Initialize the empty registry.
+        """
+        self.products = []
+        self.prices = array("d")
+        self.price_version = 0
+        self._ids_by_name = {}
+
+    def register(self, name, price):
+        """
+        Returns the product with that name, registering it on first use.
+        """
+        product_id = self._ids_by_name.get(name)
+        if product_id is not None:
+            return self.products[product_id]
+
+        product = Product(name, price, len(self.products))
+        self.prices.append(price)
+        self._ids_by_name[product.name] = product.product_id
+        self.products.append(product)
+        return product
+
+    def set_price(self, product_id, price):
+        """
+        Changes the price of a product and invalidates the cart totals.
+        """
+        self.prices[product_id] = price
+        self.products[product_id].price = price
+        self.price_version += 1
+
+
+class CompactShoppingCart:
+    """
+    Shopping cart storing product ids and quantities in compact arrays.
+    Products must come from the registry given to the cart. Carts hold few
+    lines, so a product is found by scanning the id array. Removing a line
+    moves the last line into its place, so lines are not kept in order.
+    """
+
+    __slots__ = ("registry", "product_ids", "quantities", "_total", "_price_version")
+
+    def __init__(self, registry):
+        """
+        Initialize the shopping cart.
+        """
+        self.registry = registry
+        self.product_ids = array("q")
+        self.quantities = array("q")
+        self._total = 0
+        self._price_version = registry.price_version
+
+    def __len__(self):
+        """
+        Number of distinct products in the cart.
+        """
+        return len(self.product_ids)
+
+    @property
+    def total(self):
+        """
+        Cart total, recomputed from the lines after a removal, a merged line or
+        a price change made it stale.
+        """
+        if self._total is None or self._price_version != self.registry.price_version:
+            prices = self.registry.prices
+            self._price_version = self.registry.price_version
+            self._total = _sum_lines(
+                prices[product_id] * quantity
+                for product_id, quantity in zip(self.product_ids, self.quantities)
+            )
+        return self._total
+
+    def _position(self, product_id):
+        """
+        Index of the line holding a product, or None.
+        """
+        try:
+            return self.product_ids.index(product_id)
+        except ValueError:
+            return None
+
+    def add_product(self, product, quantity=1):
+        """
+        Function to add a product to the shopping cart.
+        """
+        product_id = product.product_id
+        price = self.registry.prices[product_id]
+        quantity = index(quantity)
+        position = self._position(product_id)
+        if position is not None:
+            self.quantities[position] += quantity
+            self._total = None
+            return
+
+        # The quantity goes first, so one that does not fit the array leaves
+        # both arrays untouched.
+        self.quantities.append(quantity)
+        self.product_ids.append(product_id)
+        if self._total is not None:
+            # A new last line extends the sum exactly as recomputing it would.
+            self._total += price * quantity
+
+    def remove_product(self, product, quantity=1):
+        """
+        Function to remove a product from the shopping cart.
+        """
+        quantity = index(quantity)
+        position = self._position(product.product_id)
+        if position is None:
+            return
+
+        if self.quantities[position] <= quantity:
+            last_id = self.product_ids.pop()
+            last_quantity = self.quantities.pop()
+            if position < len(self.product_ids):
+                self.product_ids[position] = last_id
+                self.quantities[position] = last_quantity
+        else:
+            self.quantities[position] -= quantity
+        # Subtracting a line total would leave rounding errors behind.
+        self._total = None if self.product_ids else 0
+
+
+CheckoutResult = namedtuple("CheckoutResult", ["total", "lines"])
+
+
+def checkout_carts(carts):
+    """
+    Checks out many shopping carts without printing.
+    Returns one CheckoutResult with the total and number of lines per cart.
+    """
+    return [CheckoutResult(cart.total, len(cart)) for cart in carts]
+
+
+def checkout_totals(prices, quantities, offsets):
+    """
+    Totals many carts whose lines are flattened into price and quantity columns.
+    The lines of cart i are the ones between offsets[i] and offsets[i + 1].
+    """
+    if (
+        len(prices) != len(quantities)
+        or not offsets
+        or offsets[0] != 0
+        or offsets[-1] != len(prices)
+    ):
+        raise ValueError("Offsets must cover the price and quantity columns")
+    if any(map(gt, offsets, offsets[1:])):
+        raise ValueError("Offsets must not decrease")
+
+    return [
+        sum(map(mul, prices[start:end], quantities[start:end]))
+        for start, end in zip(offsets, offsets[1:])
+    ]
@@ -3,10 +3,27 @@
 """
 Book store unit testing examples.
 """
+import asyncio
+import io
+import json
+import os
+import tempfile
+import threading
 import unittest
 from unittest.mock import patch
 
-from src.book_store import Book, BookStore
+from src.book_store import (
+    Book,
+    BookStore,
+    ConcurrentBookStore,
+    ReadWriteLock,
+    handle_request,
+    iter_books_csv,
+    iter_books_jsonl,
+    iter_books_snapshot,
+    main,
+    start_service,
+)
 
 
 class TestBook(unittest.TestCase):
@@ -33,6 +50,15 @@ class TestBook(unittest.TestCase):
         self.assertEqual(book.price, self.price)
         self.assertEqual(book.quantity, self.quantity)
 
+    def test_book_is_compact(self):
+        """
+        Checks books have no per-instance dict and share interned strings.
+        """
+        book = Book(self.title, self.author, self.price, self.quantity)
+        other = Book("".join(["ti", "tle"]), self.author, self.price, self.quantity)
+        self.assertFalse(hasattr(book, "__dict__"))
+        self.assertIs(book.title, other.title)
+
     @patch("builtins.print")
     def test_book_display(self, mock_print):
         """
@@ -57,3 +83,535 @@ class TestBookStore(unittest.TestCase):
         """
         book_store = BookStore()
         self.assertEqual(book_store.books, [])
+
+    @patch("builtins.print")
+    def test_book_store_find_books_by_title(self, _mock_print):
+        """
+        Checks the title index ignores case and keeps insertion order.
+        """
+        book_store = BookStore()
+        first = Book("Dune", "Frank Herbert", 9.99, 5)
+        second = Book("DUNE", "Someone Else", 4.99, 1)
+        book_store.add_book(first)
+        book_store.add_book(second)
+        book_store.add_book(Book("Emma", "Jane Austen", 7.5, 2))
+        self.assertEqual(book_store.find_books_by_title("dune"), [first, second])
+        self.assertEqual(book_store.find_books_by_title("missing"), [])
+
+    @patch("builtins.print")
+    def test_book_store_find_books_by_author(self, _mock_print):
+        """
+        Checks the author index ignores case.
+        """
+        book_store = BookStore()
+        book = Book("Emma", "Jane Austen", 7.5, 2)
+        book_store.add_book(book)
+        self.assertEqual(book_store.find_books_by_author("JANE AUSTEN"), [book])
+
+    def test_book_store_index_results_are_copies(self):
+        """
+        Checks single and repeated matches both come back as new lists, and
+        lowercase titles are their own index keys.
+        """
+        book_store = BookStore()
+        dune = Book("dune", "Frank Herbert", 9.99, 5)
+        book_store.add_books([dune, Book("Emma", "Jane Austen", 7.5, 2)])
+        found = book_store.find_books_by_title("DUNE")
+        found.append(dune)
+        self.assertEqual(book_store.find_books_by_title("dune"), [dune])
+        book_store.add_books([Book("Dune", "Someone Else", 4.99, 1)])
+        self.assertEqual(len(book_store.find_books_by_title("dune")), 2)
+        self.assertEqual(book_store.count_books_by_author("jane austen"), 1)
+        title_index = book_store._title_index  # pylint: disable=protected-access
+        self.assertIs(next(iter(title_index)), dune.title)
+
+    @patch("builtins.print")
+    def test_book_store_search_book(self, mock_print):
+        """
+        Checks the search uses the title index.
+        """
+        book_store = BookStore()
+        book_store.add_book(Book("Emma", "Jane Austen", 7.5, 2))
+        book_store.search_book("EMMA")
+        mock_print.assert_any_call("Found 1 book(s) with title 'EMMA':")
+        book_store.search_book("Dune")
+        mock_print.assert_called_with("No book found with title 'Dune'.")
+
+    @patch("builtins.print")
+    def test_book_store_search_prefix(self, _mock_print):
+        """
+        Checks the prefix search matches titles and authors and honours the limit.
+        """
+        book_store = BookStore()
+        dune = Book("Dune", "Frank Herbert", 9.99, 5)
+        messiah = Book("Dune Messiah", "Frank Herbert", 8.99, 3)
+        emma = Book("Emma", "Jane Austen", 7.5, 2)
+        for book in (dune, messiah, emma):
+            book_store.add_book(book)
+        self.assertEqual(list(book_store.search_prefix("du")), [dune, messiah])
+        self.assertEqual(list(book_store.search_prefix("JANE")), [emma])
+        self.assertEqual(list(book_store.search_prefix("d", limit=1)), [dune])
+        self.assertEqual(list(book_store.search_prefix("messiah")), [])
+
+    @patch("builtins.print")
+    def test_book_store_search_substring(self, _mock_print):
+        """
+        Checks the substring search is lazy and case-insensitive.
+        """
+        book_store = BookStore()
+        dune = Book("Dune", "Frank Herbert", 9.99, 5)
+        messiah = Book("Dune Messiah", "Frank Herbert", 8.99, 3)
+        book_store.add_book(dune)
+        book_store.add_book(messiah)
+        results = book_store.search_substring("MESSIAH")
+        self.assertEqual(next(results), messiah)
+        self.assertEqual(list(book_store.search_substring("herb")), [dune, messiah])
+        self.assertEqual(list(book_store.search_substring("")), [dune, messiah])
+        self.assertEqual(list(book_store.search_substring("xyz")), [])
+
+    @patch("builtins.print")
+    def test_book_store_search_short_queries(self, _mock_print):
+        """
+        Checks queries and texts shorter than an n-gram are still found once each.
+        """
+        book_store = BookStore()
+        it_book = Book("It", "Stephen King", 9.99, 5)
+        emma = Book("Emma", "Jane Austen", 7.5, 2)
+        book_store.add_book(it_book)
+        book_store.add_book(emma)
+        self.assertEqual(list(book_store.search_substring("e")), [it_book, emma])
+        self.assertEqual(list(book_store.search_substring("it")), [it_book])
+        self.assertEqual(list(book_store.search_prefix("i")), [it_book])
+        self.assertEqual(list(book_store.search_prefix("mm")), [])
+
+    def test_book_store_search_after_add(self):
+        """
+        Checks books added after a search are found by the next one.
+        """
+        book_store = BookStore()
+        book_store.add_books([Book("Dune", "Frank Herbert", 9.99, 5)])
+        self.assertEqual(len(list(book_store.search_substring("dun"))), 1)
+        book_store.add_books([Book("Dune Messiah", "Frank Herbert", 8.99, 3)])
+        self.assertEqual(len(list(book_store.search_substring("dun"))), 2)
+        self.assertEqual(len(list(book_store.search_prefix("d"))), 2)
+
+    def test_book_store_add_books(self):
+        """
+        Checks the bulk insert indexes the books without printing.
+        """
+        book_store = BookStore()
+        with patch("builtins.print") as mock_print:
+            count = book_store.add_books(
+                Book(f"Title {i}", "Author", 1.0, i) for i in range(3)
+            )
+        self.assertEqual(count, 3)
+        self.assertFalse(mock_print.called)
+        self.assertEqual(len(book_store.find_books_by_author("author")), 3)
+
+    def test_book_store_csv_round_trip(self):
+        """
+        Checks books exported as CSV are streamed back unchanged.
+        """
+        book_store = BookStore()
+        book_store.add_books([Book("Emma, Vol. 1", "Jane Austen", 7.5, 2)])
+        file = io.StringIO()
+        book_store.write_books(file, fmt="csv")
+        file.seek(0)
+        (book,) = iter_books_csv(file)
+        self.assertEqual(
+            (book.title, book.author, book.price, book.quantity),
+            ("Emma, Vol. 1", "Jane Austen", 7.5, 2),
+        )
+
+    def test_book_store_jsonl_round_trip(self):
+        """
+        Checks books exported as JSON lines are streamed back unchanged.
+        """
+        book_store = BookStore()
+        book_store.add_books([Book("Dune", "Frank Herbert", 9.99, 5)])
+        file = io.StringIO()
+        book_store.write_books(file, fmt="jsonl")
+        file.seek(0)
+        (book,) = iter_books_jsonl(file)
+        self.assertEqual(
+            (book.title, book.author, book.price, book.quantity),
+            ("Dune", "Frank Herbert", 9.99, 5),
+        )
+
+    def test_book_store_write_books_invalid_format(self):
+        """
+        Checks unknown output formats are rejected.
+        """
+        with self.assertRaises(ValueError):
+            BookStore().write_books(io.StringIO(), fmt="xml")
+
+    def test_book_store_snapshot_round_trip(self):
+        """
+        Checks a binary snapshot restores every book.
+        """
+        book_store = BookStore()
+        book_store.add_books(
+            [Book("Dune", "Frank Herbert", 9.99, 5), Book("Émile", "Rousseau", 3, 0)]
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "catalogue.bin")
+            book_store.save_snapshot(path)
+            books = [
+                (book.title, book.author, book.price, book.quantity)
+                for book in iter_books_snapshot(path)
+            ]
+        self.assertEqual(
+            books, [("Dune", "Frank Herbert", 9.99, 5), ("Émile", "Rousseau", 3.0, 0)]
+        )
+
+    @patch("builtins.print")
+    def test_main_persists_catalogue(self, _mock_print):
+        """
+        Checks the CLI saves the catalogue on exit and loads it on start.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "catalogue.bin")
+            with patch(
+                "builtins.input", side_effect=["3", "Dune", "Frank", "9.5", "2", "4"]
+            ):
+                main(path)
+            with patch("builtins.input", side_effect=["1", "4"]):
+                with patch("sys.stdout", new_callable=io.StringIO) as stdout:
+                    main(path)
+        self.assertIn("Title: Dune\n", stdout.getvalue())
+
+    def test_book_store_write_books_plain(self):
+        """
+        Checks the plain format matches Book.display and supports paging.
+        """
+        book_store = BookStore()
+        book_store.add_books(Book(f"Title {i}", "Author", 1.5, i) for i in range(5))
+        stream = io.StringIO()
+        written = book_store.write_books(stream, start=1, limit=2, batch_size=1)
+        self.assertEqual(written, 2)
+        self.assertEqual(
+            stream.getvalue(),
+            "Title: Title 1\nAuthor: Author\nPrice: $1.5\nQuantity: 1\n"
+            "Title: Title 2\nAuthor: Author\nPrice: $1.5\nQuantity: 2\n",
+        )
+
+    def test_book_store_write_books_batches(self):
+        """
+        Checks books are written with one call per batch.
+        """
+        book_store = BookStore()
+        book_store.add_books(Book(f"Title {i}", "Author", 1.5, i) for i in range(5))
+        stream = io.StringIO()
+        with patch.object(stream, "write", wraps=stream.write) as mock_write:
+            book_store.write_books(stream, fmt="jsonl", batch_size=2)
+        self.assertEqual(mock_write.call_count, 3)
+        self.assertEqual(len(stream.getvalue().splitlines()), 5)
+
+    @patch("builtins.print")
+    def test_book_store_display_books_empty(self, mock_print):
+        """
+        Checks the empty store message.
+        """
+        BookStore().display_books()
+        mock_print.assert_called_once_with("No books in the store.")
+
+
+class TestBookStoreInventory(unittest.TestCase):
+    """
+    Book store inventory unittest class.
+    """
+
+    def test_book_store_inventory_aggregates(self):
+        """
+        Checks the running totals follow adds and quantity changes.
+        """
+        book_store = BookStore()
+        dune = Book("Dune", "Frank Herbert", 10.0, 5)
+        emma = Book("Emma", "Jane Austen", 4.0, 0)
+        book_store.add_books([dune, emma])
+        self.assertEqual(book_store.total_value, 50.0)
+        self.assertEqual(book_store.total_units, 5)
+        self.assertEqual(book_store.out_of_stock_books(), [emma])
+
+        book_store.update_quantity(emma, 3)
+        book_store.update_quantity(dune, 0)
+        self.assertEqual(book_store.total_value, 12.0)
+        self.assertEqual(book_store.total_units, 3)
+        self.assertEqual(book_store.out_of_stock_books(), [dune])
+
+    def test_book_store_rejects_mistyped_book(self):
+        """
+        Checks a book whose fields break the aggregates is not stored anywhere.
+        """
+        book_store = BookStore()
+        with self.assertRaises(TypeError):
+            book_store.add_books([Book("Dune", "Frank Herbert", "x", "2")])
+        self.assertEqual(book_store.books, [])
+        self.assertEqual(book_store.find_books_by_title("dune"), [])
+        self.assertEqual(list(book_store.find_books_by_price(0, 100)), [])
+        self.assertEqual(book_store.total_value, 0)
+
+    def test_book_store_count_books_by_author(self):
+        """
+        Checks the per-author count.
+        """
+        book_store = BookStore()
+        book_store.add_books(
+            [Book("Dune", "Frank Herbert", 10.0, 5), Book("Emma", "Jane Austen", 4, 1)]
+        )
+        self.assertEqual(book_store.count_books_by_author("frank herbert"), 1)
+        self.assertEqual(book_store.count_books_by_author("Nobody"), 0)
+
+    @patch("builtins.print")
+    def test_book_store_find_books_by_price(self, _mock_print):
+        """
+        Checks the price range query is inclusive and sorted by price.
+        """
+        book_store = BookStore()
+        cheap = Book("Cheap", "A", 5.0, 1)
+        middle = Book("Middle", "B", 10.0, 1)
+        pricey = Book("Pricey", "C", 20.0, 1)
+        book_store.add_books([pricey, cheap])
+        book_store.add_book(middle)
+        self.assertEqual(list(book_store.find_books_by_price(5, 10)), [cheap, middle])
+        self.assertEqual(list(book_store.find_books_by_price(11, 19)), [])
+        self.assertEqual(list(book_store.find_books_by_price(0, 100))[-1], pricey)
+
+    def test_book_store_price_ties_keep_insertion_order(self):
+        """
+        Checks books of the same price come back in insertion order after
+        the price index is sorted again.
+        """
+        book_store = BookStore()
+        first = Book("First", "A", 5.0, 1)
+        second = Book("Second", "B", 5.0, 1)
+        book_store.add_books([Book("Pricey", "C", 20.0, 1), first])
+        self.assertEqual(list(book_store.find_books_by_price(5, 5)), [first])
+        book_store.add_books([second, Book("Cheap", "D", 1.0, 1)])
+        self.assertEqual(list(book_store.find_books_by_price(5, 5)), [first, second])
+
+    def test_book_store_update_quantity_shared_book(self):
+        """
+        Checks stock changes still work for a book added to two stores.
+        """
+        book_store = BookStore()
+        other = BookStore()
+        dune = Book("Dune", "Frank Herbert", 10.0, 5)
+        book_store.add_books([Book("Emma", "Jane Austen", 4.0, 1), dune])
+        other.add_books([dune])
+        book_store.update_quantity(dune, 0)
+        self.assertEqual(book_store.out_of_stock_books(), [dune])
+        self.assertEqual(book_store.total_units, 1)
+        with self.assertRaises(ValueError):
+            other.update_quantity(Book("Emma", "Jane Austen", 4.0, 1), 0)
+
+
+class TestConcurrentBookStore(unittest.TestCase):
+    """
+    Concurrent book store unittest class.
+    """
+
+    def test_read_write_lock_shared_readers(self):
+        """
+        Checks readers share the lock and a writer waits for them.
+        """
+        lock = ReadWriteLock()
+        events = []
+
+        def write():
+            with lock.write():
+                events.append("write")
+
+        writer = threading.Thread(target=write)
+        with lock.read():
+            with lock.read():
+                writer.start()
+                writer.join(0.05)
+                self.assertEqual(events, [])
+        writer.join()
+        self.assertEqual(events, ["write"])
+
+    def test_read_write_lock_waiting_writer(self):
+        """
+        Checks new readers wait behind a waiting writer.
+        """
+        lock = ReadWriteLock()
+        events = []
+
+        def write():
+            with lock.write():
+                events.append("write")
+
+        def read():
+            with lock.read():
+                events.append("read")
+
+        writer = threading.Thread(target=write)
+        reader = threading.Thread(target=read)
+        with lock.read():
+            writer.start()
+            writer.join(0.05)
+            reader.start()
+            reader.join(0.05)
+            self.assertEqual(events, [])
+        writer.join()
+        reader.join()
+        self.assertEqual(events, ["write", "read"])
+
+    def test_concurrent_adds_and_searches(self):
+        """
+        Checks parallel inserts and lookups keep the indexes consistent.
+        """
+        book_store = ConcurrentBookStore()
+
+        def add_books(worker):
+            for i in range(200):
+                book_store.add_books([Book(f"Title {worker} {i}", "Author", 1.0, 1)])
+
+        def search_books():
+            for _ in range(200):
+                book_store.search_substring("title", limit=5)
+                book_store.find_books_by_price(0, 2)
+
+        threads = [threading.Thread(target=add_books, args=(i,)) for i in range(4)]
+        threads += [threading.Thread(target=search_books) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(book_store.count_books_by_author("author"), 800)
+        self.assertEqual(book_store.total_units, 800)
+        self.assertEqual(len(book_store.search_substring("title 3 19")), 11)
+        self.assertEqual(len(book_store.find_books_by_price(1, 1)), 800)
+
+
+class TestBookStoreService(unittest.IsolatedAsyncioTestCase):
+    """
+    Book store service unittest class.
+    """
+
+    def test_handle_request_menu(self):
+        """
+        Checks the request handler follows the menu choices.
+        """
+        book_store = BookStore()
+        response = handle_request(
+            book_store,
+            {
+                "choice": "3",
+                "books": [
+                    {"title": "Dune", "author": "Frank", "price": 9.5, "quantity": 2},
+                    {"title": "Emma", "author": "Jane", "price": 7.0, "quantity": 1},
+                ],
+            },
+        )
+        self.assertEqual(response, {"added": 2})
+        response = handle_request(book_store, {"choice": "1", "start": 1})
+        self.assertEqual([book["title"] for book in response["books"]], ["Emma"])
+        response = handle_request(book_store, {"choice": "2", "title": "dune"})
+        self.assertEqual(response["books"][0]["quantity"], 2)
+        self.assertEqual(
+            handle_request(book_store, {"choice": "5"}),
+            {"error": "Invalid choice. Please try again."},
+        )
+
+    def test_handle_request_rejects_whole_batch(self):
+        """
+        Checks a bad record keeps the rest of its batch out of the store.
+        """
+        book_store = BookStore()
+        request = {
+            "choice": "3",
+            "books": [
+                {"title": "Dune", "author": "Frank", "price": 9.5, "quantity": 2},
+                {"title": "Emma", "author": "Jane", "price": 7.0},
+            ],
+        }
+        with self.assertRaises(KeyError):
+            handle_request(book_store, request)
+        self.assertEqual(book_store.books, [])
+
+    def test_handle_request_rejects_mistyped_batch(self):
+        """
+        Checks a record with a wrong field type keeps its batch out of the store
+        and leaves the price index and snapshots working.
+        """
+        book_store = BookStore()
+        good = {"title": "Dune", "author": "Frank", "price": "9.5", "quantity": 2}
+        for bad in (
+            {"title": "c", "author": "d", "price": "x", "quantity": 2},
+            {"title": "c", "author": "d", "price": 1.0, "quantity": 2.5},
+            {"title": 1, "author": "d", "price": 1.0, "quantity": 2},
+            {"title": "c", "author": "d", "price": 1.0, "quantity": 2**64},
+        ):
+            with self.assertRaises((TypeError, ValueError)):
+                handle_request(book_store, {"choice": "3", "books": [good, bad]})
+        self.assertEqual(book_store.books, [])
+        self.assertEqual(
+            handle_request(book_store, {"choice": "3", **good}), {"added": 1}
+        )
+        self.assertEqual(book_store.books[0].price, 9.5)
+        self.assertEqual(len(list(book_store.find_books_by_price(0, 10))), 1)
+        with tempfile.TemporaryDirectory() as directory:
+            book_store.save_snapshot(os.path.join(directory, "books.snapshot"))
+
+    async def test_service_large_requests(self):
+        """
+        Checks large batches are accepted and oversized lines get an error.
+        """
+        book_store = BookStore()
+        batch = {
+            "choice": "3",
+            "books": [
+                {"title": f"Title {i}", "author": "Author", "price": 1, "quantity": 1}
+                for i in range(2000)
+            ],
+        }
+        server = await start_service(book_store, port=0, limit=200000)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(json.dumps(batch).encode() + b"\n")
+            writer.write(b'{"choice": "2", "title": "' + b"x" * 300000 + b'"}\n')
+            writer.write(b'{"choice": "2", "title": "title 7"}\n')
+            writer.write(b'{"choice": "4"}\n')
+            await writer.drain()
+            responses = [json.loads(line) async for line in reader]
+            writer.close()
+            await writer.wait_closed()
+        self.assertEqual(responses[0], {"added": 2000})
+        self.assertIn("error", responses[1])
+        self.assertEqual(responses[2]["books"][0]["title"], "Title 7")
+        self.assertEqual(responses[3:], [{"message": "Exiting..."}])
+
+    async def test_service_pipelined_requests(self):
+        """
+        Checks pipelined requests are answered in order over a socket.
+        """
+        book_store = BookStore()
+        server = await start_service(book_store, port=0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            requests = [
+                {
+                    "choice": "3",
+                    "title": "Dune",
+                    "author": "F",
+                    "price": 1,
+                    "quantity": 1,
+                },
+                {"choice": "2", "title": "DUNE"},
+            ]
+            writer.write(b"".join(json.dumps(r).encode() + b"\n" for r in requests))
+            writer.write(b"not json\n")
+            writer.write(b'{"choice": "4"}\n')
+            await writer.drain()
+            responses = [json.loads(line) async for line in reader]
+            writer.close()
+            await writer.wait_closed()
+        self.assertEqual(responses[0], {"added": 1})
+        self.assertEqual(responses[1]["books"][0]["title"], "Dune")
+        self.assertIn("error", responses[2])
+        self.assertEqual(responses[3:], [{"message": "Exiting..."}])
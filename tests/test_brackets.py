@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+"""
+Bracket table unit testing examples.
+"""
+import math
+import unittest
+from decimal import Decimal
+from fractions import Fraction
+
+from src.brackets import BracketTable, above, below
+
+
+class TestBracketTable(unittest.TestCase):
+    """
+    Bracket table unittest class.
+    """
+
+    def setUp(self):
+        """
+        Creates a table with a gap between its brackets.
+        """
+        self.table = BracketTable([(51, 100, "B"), (10, 50, "A")], "D")
+
+    def test_lookup_inside_brackets(self):
+        """
+        Checks both ends of a bracket are inclusive.
+        """
+        self.assertEqual(self.table.lookup(10), "A")
+        self.assertEqual(self.table.lookup(50), "A")
+        self.assertEqual(self.table.lookup(51), "B")
+        self.assertEqual(self.table.lookup(100), "B")
+
+    def test_lookup_outside_brackets(self):
+        """
+        Checks values below, between and above the brackets get the default.
+        """
+        self.assertEqual(self.table.lookup(9), "D")
+        self.assertEqual(self.table.lookup(50.5), "D")
+        self.assertEqual(self.table.lookup(101), "D")
+
+    def test_overlapping_brackets(self):
+        """
+        Checks overlapping brackets are rejected.
+        """
+        with self.assertRaises(ValueError):
+            BracketTable([(0, 10, "A"), (10, 20, "B")], None)
+
+    def test_exclusive_bounds(self):
+        """
+        Checks above and below exclude the bound itself.
+        """
+        table = BracketTable([(-math.inf, below(0), "-"), (above(0), math.inf, "+")], 0)
+        self.assertEqual(table.classify_many([-1e-9, 0, 1e-9]), ["-", 0, "+"])
+
+    def test_exclusive_bounds_between_floats(self):
+        """
+        Checks excluded ends leave no gap for numbers between two floats.
+        """
+        table = BracketTable(
+            [(0, below(1), "low"), (1, 2, "mid"), (above(2), 3, "high")], "out"
+        )
+        self.assertEqual(table.lookup(Decimal("0.99999999999999999999")), "low")
+        self.assertEqual(table.lookup(Fraction(2**60 + 1, 2**59)), "high")
+        self.assertEqual(table.lookup(1), "mid")
+        self.assertEqual(table.lookup(2), "mid")
+        self.assertEqual(table.lookup(math.inf), "out")
+        self.assertEqual(table.lookup(math.nan), "out")
+
+    def test_closed_end_next_to_open_end(self):
+        """
+        Checks a point shared by two brackets goes to the one including it.
+        """
+        table = BracketTable([(0, 1, "A"), (above(1), 2, "B")], None)
+        self.assertEqual(table.classify_many([1, 1.5, 2, 2.5]), ["A", "B", "B", None])
+        table = BracketTable([(0, below(1), "A"), (1, math.inf, "B")], None)
+        self.assertEqual(table.classify_many([0.5, 1, math.inf]), ["A", "B", "B"])
+
+    def test_empty_brackets(self):
+        """
+        Checks brackets holding no value are rejected.
+        """
+        for low, high in ((2, 1), (above(1), 1), (1, below(1))):
+            with self.assertRaises(ValueError):
+                BracketTable([(low, high, "A")], None)
+
+    def test_classify_many_matches_classify(self):
+        """
+        Checks the column path gives the same labels as one lookup per row.
+        """
+        table = BracketTable([(0, 10, self.table), (above(10), 20, "C")], "none")
+        rows = [(value / 4, value * 3) for value in range(-8, 90)]
+        self.assertEqual(
+            table.classify_many([row[0] for row in rows], [row[1] for row in rows]),
+            [table.classify(*row) for row in rows],
+        )
+
+    def test_nested_tables(self):
+        """
+        Checks nested tables classify the following values.
+        """
+        table = BracketTable([(0, 10, self.table)], "none")
+        self.assertEqual(table.classify(5, 60), "B")
+        self.assertEqual(table.classify(11, 60), "none")
+        self.assertEqual(table.classify_many([1, 1], [20, 0]), ["A", "D"])
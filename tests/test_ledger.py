@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+
+"""
+Account ledger unit testing examples.
+"""
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from src.ledger import (
+    AccountLedger,
+    ConcurrentAccountLedger,
+    TransactionJournal,
+    TransferStatus,
+    encode_transfer,
+    iter_journal,
+    load_ledger_snapshot,
+    recover_ledger,
+    save_ledger_snapshot,
+)
+
+
+class TestAccountLedger(unittest.TestCase):
+    """
+    Account ledger unittest class.
+    """
+
+    def setUp(self):
+        """
+        Creates a ledger with a funded account.
+        """
+        self.ledger = AccountLedger()
+        self.ledger.open_account("alice", 100)
+
+    def test_open_account(self):
+        """
+        Checks accounts are opened once, lazily with the default balance.
+        """
+        self.assertEqual(self.ledger.open_account("alice", 5), 0)
+        self.assertEqual(self.ledger.balance("alice"), 100)
+        self.assertEqual(self.ledger.balance("bob"), 0)
+        self.assertEqual(len(self.ledger), 2)
+
+    def test_transfer(self):
+        """
+        Checks the sender pays the amount and the fee, the receiver gets the amount.
+        """
+        status = self.ledger.transfer("alice", "bob", 50, "express")
+        self.assertIs(status, TransferStatus.PROCESSED)
+        self.assertEqual(self.ledger.balance("alice"), 47.5)
+        self.assertEqual(self.ledger.balance("bob"), 50)
+        self.assertEqual(self.ledger.fees["express"], 2.5)
+
+    def test_transfer_failures_change_nothing(self):
+        """
+        Checks failed transfers leave the balances and fees untouched.
+        """
+        self.assertIs(
+            self.ledger.transfer("alice", "bob", 99, "regular"),
+            TransferStatus.INSUFFICIENT_FUNDS,
+        )
+        self.assertIs(
+            self.ledger.transfer("alice", "bob", 1, "instant"),
+            TransferStatus.INVALID_TYPE,
+        )
+        self.assertEqual(list(self.ledger.balances), [100])
+        self.assertEqual(sum(self.ledger.fees.values()), 0)
+
+    def test_transfer_rejects_invalid_amounts(self):
+        """
+        Checks amounts that are not positive and finite move no money.
+        """
+        self.ledger.open_account("bob", 100)
+        for amount in (-50, 0, float("nan"), float("inf"), -float("inf")):
+            with self.subTest(amount=amount):
+                self.assertIs(
+                    self.ledger.transfer("alice", "bob", amount, "regular"),
+                    TransferStatus.INVALID_AMOUNT,
+                )
+        self.assertEqual(list(self.ledger.balances), [100, 100])
+        self.assertEqual(sum(self.ledger.fees.values()), 0)
+
+
+class TestConcurrentAccountLedger(unittest.TestCase):
+    """
+    Concurrent account ledger unittest class.
+    """
+
+    def test_concurrent_open_account(self):
+        """
+        Checks accounts opened from many threads get one slot each.
+        """
+        ledger = ConcurrentAccountLedger(10)
+        slots = []
+
+        def open_accounts():
+            slots.append([ledger.open_account(f"acc{i}") for i in range(500)])
+
+        threads = [threading.Thread(target=open_accounts) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(ledger), 500)
+        self.assertTrue(all(result == slots[0] for result in slots))
+        self.assertEqual(sum(ledger.balances), 5000)
+
+    def test_snapshot_while_opening_accounts(self):
+        """
+        Checks snapshots stay consistent while other threads open accounts.
+        """
+        ledger = ConcurrentAccountLedger(1)
+        directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "ledger.snapshot")
+
+        def open_accounts():
+            for i in range(5000):
+                ledger.open_account(f"acct{i}")
+
+        thread = threading.Thread(target=open_accounts)
+        thread.start()
+        try:
+            for _ in range(50):
+                save_ledger_snapshot(path, ledger, 0)
+                restored = AccountLedger()
+                load_ledger_snapshot(path, restored)
+                self.assertEqual(sum(restored.balances), len(restored))
+        finally:
+            thread.join()
+
+
+class TestTransactionJournal(unittest.TestCase):
+    """
+    Transaction journal unittest class.
+    """
+
+    def setUp(self):
+        """
+        Creates a temporary directory for the journal and snapshot files.
+        """
+        directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(directory.cleanup)
+        self.journal_path = os.path.join(directory.name, "transfers.journal")
+        self.snapshot_path = os.path.join(directory.name, "ledger.snapshot")
+
+    def test_group_commit(self):
+        """
+        Checks records reach the file only once a group is full.
+        """
+        with TransactionJournal(self.journal_path, group_size=2) as journal:
+            journal.append("alice", "bob", 10, "regular")
+            self.assertEqual(os.path.getsize(self.journal_path), 0)
+            journal.append("bob", "chloé", 2.5, "express")
+            self.assertEqual(journal.offset, os.path.getsize(self.journal_path))
+            journal.append("alice", "bob", 1, "scheduled")
+        records = [record[:4] for record in iter_journal(self.journal_path)]
+        self.assertEqual(
+            records,
+            [
+                ("alice", "bob", 10, "regular"),
+                ("bob", "chloé", 2.5, "express"),
+                ("alice", "bob", 1, "scheduled"),
+            ],
+        )
+
+    def test_wait_commits_the_pending_group(self):
+        """
+        Checks waiting for a record commits the whole group with one fsync.
+        """
+        with TransactionJournal(self.journal_path, group_size=64) as journal:
+            first = journal.append("alice", "bob", 10, "regular")
+            second = journal.append("bob", "alice", 5, "regular")
+            self.assertEqual(os.path.getsize(self.journal_path), 0)
+            with patch("src.ledger.os.fsync") as mock_fsync:
+                journal.wait(first)
+                journal.wait(second)
+            self.assertEqual(mock_fsync.call_count, 1)
+            self.assertEqual(len(list(iter_journal(self.journal_path))), 2)
+
+    def test_iter_journal_stops_at_torn_record(self):
+        """
+        Checks a partially written or corrupted record ends the journal.
+        """
+        with TransactionJournal(self.journal_path) as journal:
+            journal.append("alice", "bob", 10, "regular")
+            journal.append("alice", "bob", 20, "regular")
+        with open(self.journal_path, "r+b") as file:
+            file.truncate(os.path.getsize(self.journal_path) - 1)
+        self.assertEqual(len(list(iter_journal(self.journal_path))), 1)
+        with open(self.journal_path, "r+b") as file:
+            file.seek(5)
+            file.write(b"\xff")
+        self.assertEqual(list(iter_journal(self.journal_path)), [])
+
+    def test_snapshot_round_trip(self):
+        """
+        Checks balances, fees and the journal offset survive a snapshot.
+        """
+        ledger = AccountLedger(100)
+        ledger.transfer("alice", "bob", 50, "express")
+        save_ledger_snapshot(self.snapshot_path, ledger, 42)
+        restored = AccountLedger()
+        self.assertEqual(load_ledger_snapshot(self.snapshot_path, restored), 42)
+        self.assertEqual(restored.slots, ledger.slots)
+        self.assertEqual(restored.balances, ledger.balances)
+        self.assertEqual(restored.fees, ledger.fees)
+
+    def test_encode_transfer_rejects_bad_accounts(self):
+        """
+        Checks account numbers the records cannot hold are rejected.
+        """
+        with self.assertRaises(TypeError):
+            encode_transfer("alice", 12345, 10, "regular")
+        with self.assertRaises(ValueError):
+            encode_transfer("alice", "x" * 70000, 10, "regular")
+        ledger = AccountLedger(100)
+        ledger.open_account("x" * 70000)
+        with self.assertRaises(ValueError):
+            save_ledger_snapshot(self.snapshot_path, ledger, 0)
+        self.assertFalse(os.path.exists(self.snapshot_path))
+
+    def test_recover_ledger(self):
+        """
+        Checks recovery replays the journal after the snapshot and cuts a torn tail.
+        """
+        ledger = AccountLedger(100)
+        with TransactionJournal(self.journal_path, group_size=1) as journal:
+            for amount in (10, 20):
+                ledger.transfer("alice", "bob", amount, "regular")
+                journal.append("alice", "bob", amount, "regular")
+                if amount == 10:
+                    save_ledger_snapshot(self.snapshot_path, ledger, journal.offset)
+        committed = os.path.getsize(self.journal_path)
+        with open(self.journal_path, "ab") as file:
+            file.write(b"torn")
+
+        restored = AccountLedger(100)
+        offset = recover_ledger(restored, self.journal_path, self.snapshot_path)
+        self.assertEqual(offset, committed)
+        self.assertEqual(os.path.getsize(self.journal_path), committed)
+        self.assertEqual(restored.balances, ledger.balances)
+        self.assertAlmostEqual(restored.fees["regular"], 0.6)
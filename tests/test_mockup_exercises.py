@@ -4,9 +4,9 @@
 Mock up testing examples.
 """
 import unittest
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
-from src.mockup_exercises import fetch_data_from_api
+from src.mockup_exercises import create_session, fetch_data_from_api, get_shared_session
 
 
 class TestDataFetcher(unittest.TestCase):
@@ -14,12 +14,13 @@ class TestDataFetcher(unittest.TestCase):
     Data fetcher unittest class.
     """
 
-    @patch("src.mockup_exercises.requests.get")
-    def test_fetch_data_from_api_success(self, mock_get):
+    @patch("src.mockup_exercises.get_shared_session")
+    def test_fetch_data_from_api_success(self, mock_shared_session):
         """
         Success case.
         """
         # Set up the mock response
+        mock_get = mock_shared_session.return_value.get
         mock_get.return_value.json.return_value = {"key": "value"}
 
         # Mock the requests.get method
@@ -43,9 +44,55 @@ class TestDataFetcher(unittest.TestCase):
         # Assert that the function returns the expected result
         self.assertEqual(result, {"key": "value"})
 
-        # Assert that requests.get was called with the correct URL
+        # Assert that the shared session was called with the correct URL
         mock_get.assert_called_once_with("https://api.example.com/data", timeout=10)
 
+    @patch("src.mockup_exercises.get_shared_session")
+    def test_fetch_data_from_api_session(self, mock_shared_session):
+        """
+        Session case.
+        """
+        session = MagicMock()
+        session.get.return_value.json.return_value = {"key": "value"}
+
+        result = fetch_data_from_api("https://api.example.com/data", session)
+
+        self.assertEqual(result, {"key": "value"})
+        session.get.assert_called_once_with("https://api.example.com/data", timeout=10)
+        mock_shared_session.assert_not_called()
+
+
+class TestCreateSession(unittest.TestCase):
+    """
+    Pooled session unittest class.
+    """
+
+    def test_create_session(self):
+        """
+        Checks the pool and retry settings of both schemes.
+        """
+        with create_session(pool_size=4, retries=2, backoff_factor=0.5) as session:
+            self.assertEqual(session.headers["Connection"], "keep-alive")
+            for url in ("http://api.example.com", "https://api.example.com"):
+                adapter = session.get_adapter(url)
+                self.assertEqual(adapter.poolmanager.connection_pool_kw["maxsize"], 4)
+                self.assertEqual(adapter.max_retries.total, 2)
+                self.assertEqual(adapter.max_retries.backoff_factor, 0.5)
+                self.assertIn(503, adapter.max_retries.status_forcelist)
+
+    @patch("src.mockup_exercises._shared_session", None)
+    def test_get_shared_session(self):
+        """
+        Checks the shared session is created once, on first use.
+        """
+        with patch(
+            "src.mockup_exercises.create_session", wraps=create_session
+        ) as mock_create:
+            session = get_shared_session()
+            self.assertIs(get_shared_session(), session)
+        mock_create.assert_called_once_with()
+        session.close()
+
 
 # class TestPrint(unittest.TestCase):
 #     """
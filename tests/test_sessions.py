@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+"""
+Sessions unit testing examples.
+"""
+import threading
+import unittest
+from unittest.mock import patch
+
+from src.sessions import PasswordVerifier, SessionStore, hash_password
+
+
+class TestSessionStore(unittest.TestCase):
+    """
+    Session store unittest class.
+    """
+
+    def setUp(self):
+        """
+        Creates a store driven by a fake clock.
+        """
+        self.now = 0
+        self.sessions = SessionStore(ttl=10, clock=lambda: self.now)
+
+    def test_sessions_expire(self):
+        """
+        Checks sessions end once their time to live has passed.
+        """
+        self.sessions.add("alice")
+        self.now = 5
+        self.sessions.add("bob")
+        self.assertIn("alice", self.sessions)
+        self.now = 10
+        self.assertNotIn("alice", self.sessions)
+        self.assertIn("bob", self.sessions)
+        self.assertEqual(len(self.sessions), 1)
+
+    def test_renewed_session(self):
+        """
+        Checks renewing a session pushes its expiry back.
+        """
+        self.sessions.add("alice")
+        self.now = 8
+        self.sessions.add("alice")
+        self.now = 12
+        self.assertIn("alice", self.sessions)
+        self.assertEqual(len(self.sessions), 1)
+
+    def test_discard(self):
+        """
+        Checks ended sessions are gone even before they expire.
+        """
+        self.sessions.add("alice")
+        self.sessions.discard("alice")
+        self.sessions.discard("nobody")
+        self.assertNotIn("alice", self.sessions)
+        self.assertEqual(len(self.sessions), 0)
+
+
+class TestPasswordVerifier(unittest.TestCase):
+    """
+    Password verifier unittest class.
+    """
+
+    def setUp(self):
+        """
+        Creates a verifier with a known user.
+        """
+        self.verifier = PasswordVerifier(cache_size=1, iterations=1000)
+        self.verifier.set_password("alice", "secret")
+
+    def test_hash_password_is_salted(self):
+        """
+        Checks the same password gets different salts and digests.
+        """
+        self.assertNotEqual(hash_password("secret"), hash_password("secret"))
+        salt, digest = hash_password("secret")
+        self.assertEqual(hash_password("secret", salt), (salt, digest))
+
+    def test_verify(self):
+        """
+        Checks right and wrong passwords and unknown users.
+        """
+        self.assertTrue(self.verifier.verify("alice", "secret"))
+        self.assertFalse(self.verifier.verify("alice", "Secret"))
+        self.assertFalse(self.verifier.verify("bob", "secret"))
+        self.assertIn("alice", self.verifier)
+        self.assertNotIn("secret", str(self.verifier.records))
+
+    def test_verify_cache(self):
+        """
+        Checks repeated logins skip hashing until the entry is evicted.
+        """
+        self.verifier.set_password("bob", "hunter2")
+        with patch("src.sessions.hash_password", wraps=hash_password) as mock_hash:
+            self.verifier.verify("alice", "secret")
+            self.verifier.verify("alice", "secret")
+            self.assertFalse(self.verifier.verify("alice", "wrong"))
+            self.assertEqual(mock_hash.call_count, 2)
+            self.verifier.verify("bob", "hunter2")
+            self.verifier.verify("alice", "secret")
+            self.assertEqual(mock_hash.call_count, 4)
+
+    def test_set_password_clears_cache(self):
+        """
+        Checks the old password stops working after a change.
+        """
+        self.verifier.verify("alice", "secret")
+        self.verifier.set_password("alice", "changed")
+        self.assertFalse(self.verifier.verify("alice", "secret"))
+        self.assertTrue(self.verifier.verify("alice", "changed"))
+
+    def test_verify_from_many_threads(self):
+        """
+        Checks concurrent logins of many users keep the cache consistent.
+        """
+        verifier = PasswordVerifier(cache_size=4, iterations=10)
+        users = [f"user{i}" for i in range(16)]
+        for user in users:
+            verifier.set_password(user, user)
+        results = []
+
+        def login(user):
+            for _ in range(50):
+                results.append(verifier.verify(user, user))
+                results.append(not verifier.verify(user, "wrong"))
+
+        threads = [threading.Thread(target=login, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertTrue(all(results))
+        cache = verifier._cache  # pylint: disable=protected-access
+        self.assertLessEqual(len(cache), 4)
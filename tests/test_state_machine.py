@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+
+"""
+State machine unit testing examples.
+"""
+import os
+import tempfile
+import unittest
+
+from src.state_machine import (
+    MachineFacade,
+    StateMachine,
+    load_fleet_snapshot,
+    recover_fleet,
+    replay_event_log,
+)
+
+
+class TestStateMachine(unittest.TestCase):
+    """
+    State machine unittest class.
+    """
+
+    def setUp(self):
+        """
+        Creates a two state turnstile.
+        """
+        self.machine = StateMachine(
+            states=("Locked", "Unlocked"),
+            events=("coin", "push"),
+            transitions={
+                ("Locked", "coin"): ("Unlocked", "Unlocked"),
+                ("Unlocked", "push"): ("Locked", "Locked"),
+            },
+            initial="Locked",
+            invalid_message="Invalid",
+        )
+
+    def test_step(self):
+        """
+        Checks valid and invalid transitions.
+        """
+        self.assertEqual(self.machine.step(0, 0), (1, "Unlocked"))
+        self.assertEqual(self.machine.step(0, 1), (0, "Invalid"))
+        self.assertEqual(self.machine.step(1, 1), (0, "Locked"))
+
+    def test_step_many(self):
+        """
+        Checks one event steps a whole array of machines.
+        """
+        states = bytearray([0, 1, 1, 0])
+        self.assertEqual(self.machine.step_many(states, 0), bytearray([1, 1, 1, 1]))
+        self.assertEqual(self.machine.step_many(states, 1), bytearray([0, 0, 0, 0]))
+
+    def test_step_each(self):
+        """
+        Checks one event per machine.
+        """
+        self.assertEqual(
+            self.machine.step_each(bytearray([0, 1, 0]), [0, 1, 1]),
+            bytearray([1, 0, 0]),
+        )
+        with self.assertRaises(ValueError):
+            self.machine.step_each(bytearray([0]), [0, 1])
+
+    def test_event_transitions(self):
+        """
+        Checks the transitions of one event are listed by state id.
+        """
+        self.assertEqual(
+            self.machine.event_transitions("coin"), ((1, "Unlocked"), (1, "Invalid"))
+        )
+        self.assertEqual(
+            self.machine.event_transitions("push"), ((0, "Invalid"), (0, "Locked"))
+        )
+
+    def test_too_many_states(self):
+        """
+        Checks the state count has to fit in a byte.
+        """
+        with self.assertRaises(ValueError):
+            StateMachine(range(257), (), {}, 0)
+
+    def test_facade(self):
+        """
+        Checks the facade exposes state names and fires events by name.
+        """
+
+        class Turnstile(MachineFacade):
+            """
+            Turnstile facade.
+            """
+
+            machine = self.machine
+
+        turnstile = Turnstile()
+        self.assertEqual(turnstile.state, "Locked")
+        self.assertEqual(turnstile.fire("coin"), "Unlocked")
+        turnstile.state = "Locked"
+        self.assertEqual(turnstile.state_id, 0)
+
+
+class TestEventLogReplay(unittest.TestCase):
+    """
+    Event log replay unittest class.
+    """
+
+    def setUp(self):
+        """
+        Creates a turnstile machine and a temporary directory for the files.
+        """
+        self.machine = StateMachine(
+            ("Locked", "Unlocked"),
+            ("coin", "push"),
+            {
+                ("Locked", "coin"): ("Unlocked", None),
+                ("Unlocked", "push"): ("Locked", None),
+            },
+            "Locked",
+        )
+        directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(directory.cleanup)
+        self.log_path = os.path.join(directory.name, "events.log")
+        self.snapshot_path = os.path.join(directory.name, "fleet.snapshot")
+
+    def write_log(self, content):
+        """
+        Writes raw bytes to the event log.
+        """
+        with open(self.log_path, "wb") as log:
+            log.write(content)
+
+    def test_replay_event_log(self):
+        """
+        Checks events are applied in order and an incomplete line is left out.
+        """
+        self.write_log(b"0 coin\n1 coin\n0 push\n1 pu")
+        states = bytearray(2)
+        offset = replay_event_log(self.machine, self.log_path, states)
+        self.assertEqual(states, bytearray([0, 1]))
+        self.assertEqual(offset, len(b"0 coin\n1 coin\n0 push\n"))
+
+    def test_replay_stops_at_malformed_line(self):
+        """
+        Checks blank lines are skipped and replay stops before a bad line,
+        still writing the final snapshot.
+        """
+        for bad_line in (
+            b"-1 coin\n",
+            b"2 coin\n",
+            b"0 kick\n",
+            b"zero coin\n",
+            b"0\n",
+        ):
+            self.write_log(b"0 coin\n\n1 coin\n" + bad_line + b"1 push\n")
+            states = bytearray(2)
+            offset = replay_event_log(
+                self.machine, self.log_path, states, 0, self.snapshot_path
+            )
+            self.assertEqual(states, bytearray([1, 1]))
+            self.assertEqual(offset, len(b"0 coin\n\n1 coin\n"))
+            self.assertEqual(load_fleet_snapshot(self.snapshot_path), (states, offset))
+
+    def test_replay_writes_snapshots(self):
+        """
+        Checks snapshots are written periodically and at the end of replay.
+        """
+        self.write_log(b"0 coin\n1 coin\n2 coin\n")
+        states = bytearray(3)
+        replay_event_log(self.machine, self.log_path, states, 0, self.snapshot_path, 2)
+        self.assertEqual(load_fleet_snapshot(self.snapshot_path), (states, 21))
+
+    def test_recover_fleet_replays_tail(self):
+        """
+        Checks recovery starts from the snapshot and only replays the new events.
+        """
+        self.write_log(b"0 coin\n1 coin\n")
+        recover_fleet(self.machine, self.log_path, self.snapshot_path, 2)
+        with open(self.log_path, "ab") as log:
+            log.write(b"0 push\n")
+        states, offset = recover_fleet(
+            self.machine, self.log_path, self.snapshot_path, 3
+        )
+        self.assertEqual(states, bytearray([0, 1, 0]))
+        self.assertEqual(offset, 21)
+
+        # Events before the snapshot offset are not replayed again.
+        self.write_log(b"X" * 20 + b"\n1 push\n")
+        states, _ = recover_fleet(self.machine, self.log_path, self.snapshot_path, 3)
+        self.assertEqual(states, bytearray([0, 0, 0]))
+
+    def test_load_fleet_snapshot_invalid(self):
+        """
+        Checks files that are not snapshots are rejected.
+        """
+        with open(self.snapshot_path, "wb") as file:
+            file.write(b"NOPE" + bytes(16))
+        with self.assertRaises(ValueError):
+            load_fleet_snapshot(self.snapshot_path)
@@ -3,9 +3,58 @@
 """
 White-box unit testing examples.
 """
+# pylint: disable=too-many-lines
+import io
+import os
+import tempfile
+import threading
 import unittest
+from decimal import Decimal
+from unittest.mock import patch
 
-from src.white_box import VendingMachine, divide, get_grade, is_even, is_triangle
+from src.ledger import TransactionJournal, TransferStatus, iter_journal
+from src.sessions import hash_password
+from src.white_box import (
+    GRADE_BRACKETS,
+    VENDING_MACHINE_FSM,
+    BankingSystem,
+    CompactShoppingCart,
+    ConcurrentBankingSystem,
+    ElevatorSystem,
+    Product,
+    ProductRegistry,
+    ShoppingCart,
+    TrafficLight,
+    ValidationFlag,
+    VendingMachine,
+    calculate_items_shipping_cost,
+    calculate_line_totals,
+    calculate_order_total,
+    calculate_orders_shipping_cost,
+    calculate_packages_shipping_cost,
+    calculate_shipping_cost,
+    calculate_total_discount,
+    categorize_product,
+    check_loan_eligibility,
+    checkout_carts,
+    checkout_totals,
+    divide,
+    get_card_issuer,
+    get_grade,
+    grade_quiz,
+    is_even,
+    is_triangle,
+    passes_luhn_check,
+    read_records,
+    validate_credit_card,
+    validate_credit_cards,
+    validate_date,
+    validate_dates,
+    validate_password,
+    validate_passwords,
+    validate_record,
+    validate_records,
+)
 
 
 class TestWhiteBox(unittest.TestCase):
@@ -85,6 +134,336 @@ class TestWhiteBox(unittest.TestCase):
         """
         self.assertEqual(is_triangle(2, 1, 1), "No, it's not a triangle.")
 
+    def test_calculate_line_totals_matches_order_total(self):
+        """
+        Checks the batch pricing gives the same total as the scalar function.
+        """
+        quantities = list(range(13))
+        prices = [0.1 * (i + 1) for i in range(13)]
+        items = [
+            {"quantity": quantity, "price": price}
+            for quantity, price in zip(quantities, prices)
+        ]
+        self.assertEqual(
+            sum(calculate_line_totals(quantities, prices)),
+            calculate_order_total(items),
+        )
+
+    def test_calculate_line_totals_discounts(self):
+        """
+        Checks the quantity discount tiers of the batch pricing.
+        """
+        line_totals = calculate_line_totals([5, 6, 11], [10, 10, 10])
+        self.assertEqual(line_totals[0], 50)
+        self.assertAlmostEqual(line_totals[1], 57)
+        self.assertAlmostEqual(line_totals[2], 99)
+
+    def test_calculate_line_totals_length_mismatch(self):
+        """
+        Checks the columns must have the same length.
+        """
+        with self.assertRaises(ValueError):
+            calculate_line_totals([1, 2], [1])
+
+    def test_calculate_orders_shipping_cost(self):
+        """
+        Checks the rate table matches the scalar shipping costs.
+        """
+        weights = [0, 5, 5.5, 10, 10.5, 100] * 2
+        methods = ["standard"] * 6 + ["express"] * 6
+        expected = [
+            calculate_items_shipping_cost([{"weight": weight}], method)
+            for weight, method in zip(weights, methods)
+        ]
+        self.assertEqual(calculate_orders_shipping_cost(weights, methods), expected)
+
+    def test_calculate_orders_shipping_cost_invalid_method(self):
+        """
+        Checks unknown shipping methods are reported per order.
+        """
+        self.assertEqual(
+            calculate_orders_shipping_cost([1, 1], ["drone", "express"]), [None, 20]
+        )
+
+    def test_calculate_packages_shipping_cost(self):
+        """
+        Checks the package batch matches the scalar shipping costs.
+        """
+        packages = [(1, 10, 10, 10), (3, 20, 20, 20), (3, 5, 20, 20), (9, 1, 1, 1)]
+        self.assertEqual(
+            calculate_packages_shipping_cost(*zip(*packages)),
+            [calculate_shipping_cost(*package) for package in packages],
+        )
+
+    def test_validate_password(self):
+        """
+        Checks every character class is required.
+        """
+        self.assertTrue(validate_password("Abcdef1!"))
+        self.assertTrue(validate_password("Abcdef١!"))
+        self.assertFalse(validate_password("Abcde1!"))
+        self.assertFalse(validate_password("abcdef1!"))
+        self.assertFalse(validate_password("ABCDEF1!"))
+        self.assertFalse(validate_password("Abcdefg!"))
+        self.assertFalse(validate_password("Abcdefg1"))
+        self.assertFalse(validate_password("Ábcdefg1!"))
+
+    def test_validate_passwords(self):
+        """
+        Checks the bulk validation yields one result per line.
+        """
+        results = validate_passwords(["Abcdef1!\n", "weak\r\n", "Abcdef1!"])
+        self.assertEqual(list(results), [True, False, True])
+
+
+class TestWhiteBoxBrackets(unittest.TestCase):
+    """
+    Bracket based functions unit tests.
+    """
+
+    def test_brackets_exclusive_ends(self):
+        """
+        Checks numbers finer than a float land in the same bracket as before
+        the tables existed.
+        """
+        self.assertEqual(get_grade(Decimal("89.999999999999999")), "B")
+        self.assertEqual(
+            check_loan_eligibility(Decimal("60000.0000000000001"), 800), "Premium Loan"
+        )
+
+    def test_get_grade_batch(self):
+        """
+        Checks the grade brackets classify a batch of scores.
+        """
+        self.assertEqual(
+            GRADE_BRACKETS.classify_many([90, 89.5, 70, 69.9]), list("ABCF")
+        )
+
+    def test_calculate_total_discount(self):
+        """
+        Checks the discount brackets.
+        """
+        self.assertEqual(calculate_total_discount(99), 0)
+        self.assertEqual(calculate_total_discount(500), 50)
+        self.assertEqual(calculate_total_discount(1000), 200)
+
+    def test_categorize_product(self):
+        """
+        Checks prices between the category brackets fall in Category D.
+        """
+        self.assertEqual(categorize_product(50), "Category A")
+        self.assertEqual(categorize_product(50.5), "Category D")
+        self.assertEqual(categorize_product(200), "Category C")
+
+    def test_check_loan_eligibility(self):
+        """
+        Checks the credit score brackets of each income bracket.
+        """
+        self.assertEqual(check_loan_eligibility(29999, 800), "Not Eligible")
+        self.assertEqual(check_loan_eligibility(60000, 701), "Standard Loan")
+        self.assertEqual(check_loan_eligibility(60000, 700), "Secured Loan")
+        self.assertEqual(check_loan_eligibility(60001, 751), "Premium Loan")
+        self.assertEqual(check_loan_eligibility(60001, 750), "Standard Loan")
+
+    def test_grade_quiz(self):
+        """
+        Checks the incorrect answer brackets of each correct answer bracket.
+        """
+        self.assertEqual(grade_quiz(7, 2), "Pass")
+        self.assertEqual(grade_quiz(7, 3), "Conditional Pass")
+        self.assertEqual(grade_quiz(6, 2), "Conditional Pass")
+        self.assertEqual(grade_quiz(6, 4), "Fail")
+        self.assertEqual(grade_quiz(4, 0), "Fail")
+
+
+class TestWhiteBoxCreditCard(unittest.TestCase):
+    """
+    Credit card validation unit tests.
+    """
+
+    def test_validate_credit_card_default(self):
+        """
+        Checks the default mode only checks length and digits.
+        """
+        self.assertEqual(validate_credit_card("1234567890123"), "Valid Card")
+        self.assertEqual(validate_credit_card("123456789012"), "Invalid Card")
+        self.assertEqual(validate_credit_card("12345678901234a"), "Invalid Card")
+
+    def test_validate_credit_card_strict(self):
+        """
+        Checks strict mode rejects unknown issuers, bad lengths and checksums.
+        """
+        self.assertEqual(validate_credit_card("4111111111111111", True), "Valid Card")
+        self.assertEqual(validate_credit_card("378282246310005", True), "Valid Card")
+        self.assertEqual(validate_credit_card("4111111111111112", True), "Invalid Card")
+        self.assertEqual(validate_credit_card("1234567890123", True), "Invalid Card")
+        self.assertEqual(
+            validate_credit_card("378282246310005", strict=False), "Valid Card"
+        )
+        self.assertEqual(validate_credit_card("3782822463100050", True), "Invalid Card")
+
+    def test_get_card_issuer(self):
+        """
+        Checks the longest prefix decides the issuer.
+        """
+        self.assertEqual(get_card_issuer("5555555555554444"), "Mastercard")
+        self.assertEqual(get_card_issuer("2223003122003222"), "Mastercard")
+        self.assertEqual(get_card_issuer("6011111111111117"), "Discover")
+        self.assertEqual(get_card_issuer("3530111333300000"), "JCB")
+        self.assertEqual(get_card_issuer("30569309025904"), "Diners Club")
+        self.assertIsNone(get_card_issuer("9999999999999"))
+
+    def test_passes_luhn_check(self):
+        """
+        Checks the Luhn checksum.
+        """
+        self.assertTrue(passes_luhn_check("79927398713"))
+        self.assertFalse(passes_luhn_check("79927398710"))
+
+    def test_validate_credit_cards(self):
+        """
+        Checks the batch validation gives one result per card number.
+        """
+        card_numbers = ["4111111111111111", "4111111111111112", "12", "4111a"]
+        self.assertEqual(
+            validate_credit_cards(card_numbers, strict=True),
+            [True, False, False, False],
+        )
+        self.assertEqual(
+            validate_credit_cards(card_numbers), [True, True, False, False]
+        )
+
+    def test_validate_credit_cards_matches_scalar(self):
+        """
+        Checks the batch agrees with validate_credit_card in both modes.
+        """
+        card_numbers = [
+            "378282246310005",
+            "30569309025904",
+            "6011111111111117",
+            "5555555555554444",
+            "2221000000000009",
+            "3530111333300000",
+            "4222222222222",
+            "0000000000000",
+            "4111111111111111111",
+            "411111111111111１",
+            "",
+        ]
+        for strict in (False, True):
+            self.assertEqual(
+                validate_credit_cards(card_numbers, strict),
+                [
+                    validate_credit_card(card_number, strict) == "Valid Card"
+                    for card_number in card_numbers
+                ],
+            )
+
+
+class TestWhiteBoxDate(unittest.TestCase):
+    """
+    Date validation unit tests.
+    """
+
+    def test_validate_date_default(self):
+        """
+        Checks the default mode accepts any day up to 31.
+        """
+        self.assertEqual(validate_date(2023, 2, 31), "Valid Date")
+        self.assertEqual(validate_date(1899, 1, 1), "Invalid Date")
+
+    def test_validate_date_strict(self):
+        """
+        Checks strict mode follows the calendar, leap years included.
+        """
+        self.assertEqual(validate_date(2024, 2, 29, strict=True), "Valid Date")
+        self.assertEqual(validate_date(2100, 12, 31, strict=True), "Valid Date")
+        self.assertEqual(validate_date(2023, 2, 29, strict=True), "Invalid Date")
+        self.assertEqual(validate_date(1900, 2, 29, strict=True), "Invalid Date")
+        self.assertEqual(validate_date(2000, 4, 31, strict=True), "Invalid Date")
+        self.assertEqual(validate_date(2000, 13, 1, strict=True), "Invalid Date")
+
+    def test_validate_dates(self):
+        """
+        Checks the batch validation is calendar-correct.
+        """
+        self.assertEqual(
+            validate_dates([2000, 2001, 2101, 2001], [2, 2, 1, 6], [29, 29, 1, 30]),
+            [True, False, False, True],
+        )
+
+
+class TestWhiteBoxValidationPipeline(unittest.TestCase):
+    """
+    Validation pipeline unit tests.
+    """
+
+    VALID_RECORD = {
+        "email": "user@example.com",
+        "url": "https://example.com",
+        "card_number": "4111111111111111",
+        "year": 2024,
+        "month": 2,
+        "day": 29,
+        "username": "someone",
+        "password": "secret123",
+    }
+
+    def test_validate_record_valid(self):
+        """
+        Checks a valid record has no flags set.
+        """
+        self.assertEqual(validate_record(self.VALID_RECORD), ValidationFlag.VALID)
+
+    def test_validate_record_flags(self):
+        """
+        Checks each failed or missing field sets its flag.
+        """
+        record = dict(self.VALID_RECORD, email="nope", month="thirteen")
+        del record["username"]
+        self.assertEqual(
+            validate_record(record),
+            ValidationFlag.EMAIL | ValidationFlag.DATE | ValidationFlag.LOGIN,
+        )
+
+    def test_validate_record_selected_fields(self):
+        """
+        Checks only the configured checks run, on the configured fields.
+        """
+        fields = {ValidationFlag.EMAIL: ("contact",)}
+        self.assertEqual(validate_record({"contact": "a@b.co"}, fields), 0)
+
+    def test_validate_records_csv(self):
+        """
+        Checks CSV records are validated in order across batches.
+        """
+        file = io.StringIO("email,year,month,day\na@b.co,2000,1,1\nbad,1800,1,1\n")
+        fields = {
+            ValidationFlag.EMAIL: ("email",),
+            ValidationFlag.DATE: ("year", "month", "day"),
+        }
+        results = validate_records(read_records(file, "csv"), fields, batch_size=1)
+        self.assertEqual(
+            list(results),
+            [ValidationFlag.VALID, ValidationFlag.EMAIL | ValidationFlag.DATE],
+        )
+
+    def test_validate_records_workers(self):
+        """
+        Checks the process pool gives the same results as the serial path.
+        """
+        records = [self.VALID_RECORD, {}] * 10
+        expected = list(validate_records(records))
+        results = validate_records(records, workers=2, batch_size=3)
+        self.assertEqual(list(results), expected)
+
+    def test_read_records_jsonl(self):
+        """
+        Checks JSON lines are read skipping blank lines.
+        """
+        file = io.StringIO('{"email": "a@b.co"}\n\n{"email": "x"}\n')
+        self.assertEqual(len(list(read_records(file))), 2)
+
 
 class TestWhiteBoxVendingMachine(unittest.TestCase):
     """
@@ -125,3 +504,526 @@ class TestWhiteBoxVendingMachine(unittest.TestCase):
 
         self.assertEqual(self.vending_machine.state, "Dispensing")
         self.assertEqual(output, "Coin Inserted. Select your drink.")
+
+
+class TestWhiteBoxStateMachines(unittest.TestCase):
+    """
+    State machine facades unit tests.
+    """
+
+    def test_elevator_system(self):
+        """
+        Checks the elevator messages and states.
+        """
+        elevator = ElevatorSystem()
+        self.assertEqual(elevator.stop(), "Invalid operation in current state")
+        self.assertEqual(elevator.move_down(), "Elevator moving down")
+        self.assertEqual(elevator.move_up(), "Invalid operation in current state")
+        self.assertEqual(elevator.stop(), "Elevator stopped")
+        self.assertEqual(elevator.state, "Idle")
+
+    def test_traffic_light(self):
+        """
+        Checks the traffic light cycles through its states.
+        """
+        traffic_light = TrafficLight()
+        states = []
+        for _ in range(3):
+            traffic_light.change_state()
+            states.append(traffic_light.get_current_state())
+        self.assertEqual(states, ["Green", "Yellow", "Red"])
+
+    def test_fleet_step(self):
+        """
+        Checks a fleet of vending machines is stepped with one event.
+        """
+        insert_coin = VENDING_MACHINE_FSM.event_ids["insert_coin"]
+        states = VENDING_MACHINE_FSM.step_many(bytearray(3), insert_coin)
+        self.assertEqual(
+            [VENDING_MACHINE_FSM.states[state] for state in states], ["Dispensing"] * 3
+        )
+
+
+class TestWhiteBoxShoppingCart(unittest.TestCase):
+    """
+    Shopping cart unit tests.
+    """
+
+    def setUp(self):
+        """
+        Creates an empty cart and two products.
+        """
+        self.cart = ShoppingCart()
+        self.apple = Product("apple", 2)
+        self.pear = Product("pear", 3)
+
+    def test_add_product(self):
+        """
+        Checks adding a product twice merges its line and keeps the order.
+        """
+        self.cart.add_product(self.apple)
+        self.cart.add_product(self.pear, 2)
+        self.cart.add_product(self.apple, 3)
+        self.assertEqual(
+            self.cart.items,
+            [
+                {"product": self.apple, "quantity": 4},
+                {"product": self.pear, "quantity": 2},
+            ],
+        )
+        self.assertEqual(self.cart.total, 14)
+
+    def test_remove_product(self):
+        """
+        Checks removing reduces the line and drops it when nothing is left.
+        """
+        self.cart.add_product(self.apple, 3)
+        self.cart.add_product(self.pear)
+        self.cart.remove_product(self.apple)
+        self.assertEqual(self.cart.items[0]["quantity"], 2)
+        self.assertEqual(self.cart.total, 7)
+        self.cart.remove_product(self.apple, 5)
+        self.cart.remove_product(Product("plum", 1))
+        self.assertEqual(self.cart.items, [{"product": self.pear, "quantity": 1}])
+        self.assertEqual(self.cart.total, 3)
+        self.cart.remove_product(self.pear)
+        self.assertEqual(self.cart.total, 0)
+
+    @patch("builtins.print")
+    def test_checkout(self, mock_print):
+        """
+        Checks the checkout prints the total.
+        """
+        self.cart.add_product(self.apple, 2)
+        self.cart.checkout()
+        mock_print.assert_any_call("Total: $4")
+
+    @patch("builtins.print")
+    def test_checkout_after_partial_removal(self, mock_print):
+        """
+        Checks removals leave no rounding error behind in the total.
+        """
+        mint = Product("mint", 0.2)
+        self.cart.add_product(Product("gum", 0.1))
+        self.cart.add_product(mint)
+        self.cart.remove_product(mint)
+        self.cart.checkout()
+        mock_print.assert_any_call("Total: $0.1")
+
+    def test_total_is_cached(self):
+        """
+        Checks the total is kept as lines are appended rather than re-summed.
+        """
+        self.cart.add_product(self.apple, 2)
+        self.cart.add_product(self.pear)
+        self.assertEqual(self.cart.total, 7)
+        # Without a registry a price change is not seen until the lines change.
+        self.apple.price = 100
+        self.assertEqual(self.cart.total, 7)
+        self.cart.add_product(self.apple)
+        self.assertEqual(self.cart.total, 303)
+
+    def test_add_and_remove_many(self):
+        """
+        Checks the bulk operations apply every pair.
+        """
+        self.cart.add_many([(self.apple, 2), (self.pear, 1), (self.apple, 1)])
+        self.cart.remove_many([(self.pear, 1), (self.apple, 2)])
+        self.assertEqual(self.cart.items, [{"product": self.apple, "quantity": 1}])
+        self.assertEqual(self.cart.total, 2)
+
+    def test_checkout_carts(self):
+        """
+        Checks the batch checkout returns results without printing.
+        """
+        other = ShoppingCart()
+        other.add_many([(self.apple, 1), (self.pear, 2)])
+        with patch("builtins.print") as mock_print:
+            results = checkout_carts([self.cart, other])
+        self.assertFalse(mock_print.called)
+        self.assertEqual(results[1], (8, 2))
+        self.assertEqual(results[0].total, 0)
+
+    def test_checkout_totals(self):
+        """
+        Checks the flattened columns are totalled per cart.
+        """
+        self.assertEqual(
+            checkout_totals([2, 3, 5], [1, 2, 3], [0, 2, 2, 3]), [8, 0, 15]
+        )
+        self.assertEqual(checkout_totals([], [], [0]), [])
+        with self.assertRaises(ValueError):
+            checkout_totals([2, 3], [1, 2], [0, 1])
+
+    def test_checkout_totals_rejects_bad_offsets(self):
+        """
+        Checks offsets that would drop or repeat lines are rejected.
+        """
+        for offsets in ([], [1, 2], [0, 2, 1, 2], [0, 1, 0, 2]):
+            with self.subTest(offsets=offsets):
+                with self.assertRaises(ValueError):
+                    checkout_totals([2, 3], [1, 2], offsets)
+
+
+class TestWhiteBoxProductRegistry(unittest.TestCase):
+    """
+    Product registry and compact cart unit tests.
+    """
+
+    def setUp(self):
+        """
+        Creates a registry with two products and a compact cart.
+        """
+        self.registry = ProductRegistry()
+        self.apple = self.registry.register("apple", 2)
+        self.pear = self.registry.register("pear", 3)
+        self.cart = CompactShoppingCart(self.registry)
+
+    def test_register(self):
+        """
+        Checks products get sequential ids and are shared by name.
+        """
+        self.assertEqual((self.apple.product_id, self.pear.product_id), (0, 1))
+        self.assertIs(self.registry.register("apple", 5), self.apple)
+        self.assertFalse(hasattr(self.apple, "__dict__"))
+
+    def test_compact_cart(self):
+        """
+        Checks the arrays and running total follow adds and removes.
+        """
+        self.cart.add_product(self.apple, 2)
+        self.cart.add_product(self.pear)
+        self.cart.add_product(self.apple)
+        self.assertEqual(self.cart.total, 9)
+        self.cart.remove_product(self.apple, 3)
+        self.assertEqual(list(self.cart.product_ids), [self.pear.product_id])
+        self.assertEqual(list(self.cart.quantities), [1])
+        self.assertEqual(len(self.cart), 1)
+        self.assertEqual(self.cart.total, 3)
+        self.cart.remove_product(self.pear)
+        self.assertEqual(self.cart.total, 0)
+
+    def test_set_price_invalidates_cached_totals(self):
+        """
+        Checks cached totals are recomputed after a price change.
+        """
+        other = CompactShoppingCart(self.registry)
+        self.cart.add_product(self.apple, 2)
+        other.add_product(self.pear)
+        self.assertEqual((self.cart.total, other.total), (4, 3))
+        self.registry.set_price(self.apple.product_id, 10)
+        self.assertEqual((self.cart.total, other.total), (20, 3))
+        self.assertEqual(self.apple.price, 10)
+
+    def test_compact_cart_total_is_exact(self):
+        """
+        Checks removals and merged lines leave no rounding error in the total.
+        """
+        gum = self.registry.register("gum", 0.1)
+        mint = self.registry.register("mint", 0.2)
+        self.cart.add_product(gum)
+        self.cart.add_product(mint)
+        self.cart.remove_product(mint)
+        self.assertEqual(self.cart.total, 0.1)
+        self.cart.add_product(mint)
+        self.cart.add_product(gum, 2)
+        self.assertEqual(self.cart.total, 0.1 * 3 + 0.2)
+
+    def test_compact_cart_rejects_bad_quantity(self):
+        """
+        Checks a quantity the arrays cannot hold leaves the cart unchanged.
+        """
+        self.cart.add_product(self.apple)
+        for quantity in (1.5, 2**63):
+            with self.assertRaises((TypeError, OverflowError)):
+                self.cart.add_product(self.pear, quantity)
+        self.assertEqual(len(self.cart.product_ids), len(self.cart.quantities))
+        self.cart.add_product(self.pear)
+        self.assertEqual(list(self.cart.quantities), [1, 1])
+        self.assertEqual(self.cart.total, 5)
+
+    def test_set_price_reaches_both_cart_types(self):
+        """
+        Checks plain and compact carts holding a product see its new price.
+        """
+        plain = ShoppingCart(self.registry)
+        plain.add_product(self.apple, 2)
+        self.cart.add_product(self.apple, 2)
+        self.assertEqual((plain.total, self.cart.total), (4, 4))
+        self.registry.set_price(self.apple.product_id, 50.0)
+        self.assertEqual((plain.total, self.cart.total), (100.0, 100.0))
+        plain.remove_product(self.apple)
+        self.cart.remove_product(self.apple)
+        self.assertEqual((plain.total, self.cart.total), (50.0, 50.0))
+        plain.remove_product(self.apple)
+        self.assertEqual(plain.total, 0)
+
+
+class TestWhiteBoxBankingSystem(unittest.TestCase):
+    """
+    Banking system unit tests.
+    """
+
+    def setUp(self):
+        """
+        Creates a banking system with an authenticated user.
+        """
+        self.banking_system = BankingSystem()
+        with patch("builtins.print"):
+            self.banking_system.authenticate("user123", "pass123")
+
+    @patch("builtins.print")
+    def test_transfer_money_updates_balances(self, mock_print):
+        """
+        Checks a transfer debits the sender with the fee and credits the receiver.
+        """
+        self.assertTrue(
+            self.banking_system.transfer_money("user123", "bob", 100, "regular")
+        )
+        self.assertEqual(self.banking_system.get_account("user123").balance, 898)
+        self.assertEqual(self.banking_system.get_account("bob").balance, 1100)
+        mock_print.assert_called_with(
+            "Money transfer of $100 (regular transfer)"
+            " from user123 to bob processed successfully."
+        )
+
+    @patch("builtins.print")
+    def test_transfer_money_insufficient_funds(self, mock_print):
+        """
+        Checks balances are tracked across transfers.
+        """
+        self.banking_system.transfer_money("user123", "bob", 900, "scheduled")
+        self.assertFalse(
+            self.banking_system.transfer_money("user123", "bob", 100, "scheduled")
+        )
+        mock_print.assert_called_with("Insufficient funds.")
+
+    def test_settle(self):
+        """
+        Checks the batch settlement returns one status per transfer without printing.
+        """
+        with patch("builtins.print") as mock_print:
+            statuses = self.banking_system.settle(
+                [
+                    ("user123", "bob", 500, "express"),
+                    ("user123", "bob", 500, "express"),
+                    ("bob", "user123", 1, "regular"),
+                    ("user123", "bob", 1, "wire"),
+                ]
+            )
+        self.assertFalse(mock_print.called)
+        self.assertEqual(
+            statuses,
+            [
+                TransferStatus.PROCESSED,
+                TransferStatus.INSUFFICIENT_FUNDS,
+                TransferStatus.NOT_AUTHENTICATED,
+                TransferStatus.INVALID_TYPE,
+            ],
+        )
+        self.assertEqual(self.banking_system.ledger.fees["express"], 25)
+
+    def test_journal_checkpoint_and_restore(self):
+        """
+        Checks a fresh system restores the balances from the snapshot and journal.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            journal_path = os.path.join(directory, "transfers.journal")
+            snapshot_path = os.path.join(directory, "ledger.snapshot")
+            with TransactionJournal(journal_path, group_size=8) as journal:
+                self.banking_system.journal = journal
+                self.banking_system.settle([("user123", "bob", 100, "regular")])
+                self.banking_system.checkpoint(snapshot_path)
+                self.banking_system.settle(
+                    [
+                        ("user123", "bob", 50, "express"),
+                        ("user123", "bob", 1e6, "regular"),
+                    ]
+                )
+            restored = BankingSystem()
+            restored.restore(journal_path, snapshot_path)
+        self.assertEqual(restored.ledger.balances, self.banking_system.ledger.balances)
+        self.assertEqual(restored.get_account("user123").balance, 845.5)
+
+    @patch("builtins.print")
+    def test_journaled_transfers_are_durable_when_reported(self, _mock_print):
+        """
+        Checks reported transfers are already in the journal file, with one
+        fsync per settled batch.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            journal_path = os.path.join(directory, "transfers.journal")
+            with TransactionJournal(journal_path, group_size=64) as journal:
+                self.banking_system.journal = journal
+                self.assertTrue(
+                    self.banking_system.transfer_money("user123", "bob", 1, "regular")
+                )
+                self.assertEqual(len(list(iter_journal(journal_path))), 1)
+                with patch("src.ledger.os.fsync") as mock_fsync:
+                    self.banking_system.settle([("user123", "bob", 1, "regular")] * 3)
+                self.assertEqual(mock_fsync.call_count, 1)
+                self.assertEqual(len(list(iter_journal(journal_path))), 4)
+
+    @patch("builtins.print")
+    def test_transfer_money_invalid_amount(self, mock_print):
+        """
+        Checks a negative amount cannot pull money out of the receiver.
+        """
+        self.assertFalse(
+            self.banking_system.transfer_money("user123", "victim", -500, "regular")
+        )
+        mock_print.assert_called_with("Invalid transfer amount.")
+        self.assertEqual(self.banking_system.get_account("user123").balance, 1000)
+        self.assertEqual(self.banking_system.get_account("victim").balance, 1000)
+
+    @patch("builtins.print")
+    def test_journaled_transfer_to_non_str_receiver(self, _mock_print):
+        """
+        Checks a numeric receiver is journaled as a string, and a receiver the
+        journal cannot record raises before any money moves.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            journal_path = os.path.join(directory, "transfers.journal")
+            with TransactionJournal(journal_path, group_size=1) as journal:
+                self.banking_system.journal = journal
+                self.assertTrue(
+                    self.banking_system.transfer_money("user123", 12345, 10, "regular")
+                )
+                with self.assertRaises(ValueError):
+                    self.banking_system.transfer_money(
+                        "user123", "x" * 70000, 10, "regular"
+                    )
+            restored = BankingSystem()
+            restored.restore(journal_path)
+        self.assertAlmostEqual(
+            self.banking_system.get_account("user123").balance, 989.8
+        )
+        self.assertEqual(self.banking_system.get_account(12345).balance, 1010)
+        self.assertEqual(restored.get_account("12345").balance, 1010)
+        self.assertNotIn("x" * 70000, self.banking_system.ledger.slots)
+
+    @patch("builtins.print")
+    def test_authenticate(self, mock_print):
+        """
+        Checks logins are verified against the hashed password.
+        """
+        self.assertFalse(self.banking_system.authenticate("user123", "pass123"))
+        mock_print.assert_called_with("User already logged in.")
+        self.assertFalse(self.banking_system.authenticate("user123", "wrong"))
+        mock_print.assert_called_with("Authentication failed.")
+        self.assertNotIn("pass123", str(self.banking_system.users.records))
+
+    @patch("builtins.print")
+    def test_expired_session(self, mock_print):
+        """
+        Checks transfers are refused once the session has expired.
+        """
+        banking_system = BankingSystem(session_ttl=0)
+        self.assertTrue(banking_system.authenticate("user123", "pass123"))
+        self.assertFalse(banking_system.transfer_money("user123", "bob", 1, "regular"))
+        mock_print.assert_called_with("Sender not authenticated.")
+
+
+class TestWhiteBoxConcurrentBankingSystem(unittest.TestCase):
+    """
+    Concurrent banking system unit tests.
+    """
+
+    def run_transfers(self, banking_system, workers=8, transfers=300):
+        """
+        Runs transfers around a ring of accounts from many threads.
+        """
+        accounts = [f"user{i}" for i in range(workers)]
+        for account in accounts:
+            banking_system.users.set_password(account, "secret")
+        with patch("builtins.print"):
+            for account in accounts:
+                banking_system.authenticate(account, "secret")
+
+        def transfer(index):
+            sender = accounts[index]
+            receiver = accounts[(index + 1) % workers]
+            banking_system.settle(
+                [(sender, receiver, 1, "regular"), (receiver, sender, 1, "express")]
+                * transfers
+            )
+
+        threads = [threading.Thread(target=transfer, args=(i,)) for i in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return accounts
+
+    def test_concurrent_transfers_conserve_money(self):
+        """
+        Checks no money is created or lost by concurrent transfers.
+        """
+        banking_system = ConcurrentBankingSystem()
+        accounts = self.run_transfers(banking_system)
+        ledger = banking_system.ledger
+        self.assertEqual(len(ledger), len(accounts))
+        self.assertAlmostEqual(
+            sum(ledger.balances) + sum(ledger.fees.values()), 1000 * len(accounts)
+        )
+        self.assertAlmostEqual(ledger.fees["regular"], 0.02 * 8 * 300)
+
+    def test_concurrent_journal_restores_balances(self):
+        """
+        Checks transfers journaled from many threads replay to the same balances.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            journal_path = os.path.join(directory, "transfers.journal")
+            with TransactionJournal(journal_path, group_size=16) as journal:
+                banking_system = ConcurrentBankingSystem(journal=journal)
+                self.run_transfers(banking_system, workers=4, transfers=50)
+            restored = BankingSystem()
+            restored.restore(journal_path)
+        for account in banking_system.ledger.slots:
+            self.assertAlmostEqual(
+                restored.get_account(account).balance,
+                banking_system.get_account(account).balance,
+            )
+
+    def test_single_stripe(self):
+        """
+        Checks both accounts sharing one stripe does not deadlock.
+        """
+        banking_system = ConcurrentBankingSystem(stripes=1)
+        self.run_transfers(banking_system, workers=2, transfers=10)
+        self.assertAlmostEqual(banking_system.ledger.fees["express"], 0.05 * 20)
+
+    def test_login_does_not_block_transfers(self):
+        """
+        Checks a transfer goes through while another login is still hashing.
+        """
+        banking_system = ConcurrentBankingSystem()
+        for account in ("alice", "bob"):
+            banking_system.users.set_password(account, "secret")
+        with patch("builtins.print"):
+            banking_system.authenticate("alice", "secret")
+        hashing = threading.Event()
+        release = threading.Event()
+
+        def slow_hash(*args, **kwargs):
+            hashing.set()
+            release.wait(5)
+            return hash_password(*args, **kwargs)
+
+        timer = threading.Timer(1, release.set)
+        with patch("src.sessions.hash_password", side_effect=slow_hash):
+            with patch("builtins.print"):
+                login = threading.Thread(
+                    target=banking_system.authenticate, args=("bob", "secret")
+                )
+                login.start()
+                hashing.wait(5)
+                timer.start()
+                status = banking_system.apply_transfer("alice", "bob", 1, "regular")
+                blocked = release.is_set()
+                release.set()
+                login.join()
+        timer.cancel()
+        self.assertIs(status, TransferStatus.PROCESSED)
+        self.assertFalse(blocked)
+        self.assertIn("bob", banking_system.logged_in_users)